@@ -1,4 +1,5 @@
 import sys
+import multiprocessing
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QHBoxLayout, QVBoxLayout, QPushButton, QLabel, QSizePolicy, QLineEdit, QDateTimeEdit, QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView, QMessageBox, QFrame, QDialog, QTimeEdit, QSpinBox, QFileDialog, QTextEdit, QComboBox
 )
@@ -7,7 +8,10 @@ from PyQt5.QtCore import Qt, QSize, QTime, QTimer, QObject
 from task_manager import TaskManager
 from recorder import Recorder
 from functools import partial
-from monitor_worker import MonitorWorker
+from monitor_worker import MonitorWorker, MonitorProcessWorker
+from ocr_preprocess import PRESETS
+from alert_rules import parse_rules, format_rules
+from monitor_config import load_monitor_config
 
 class TaskScheduler(QObject):
     def __init__(self, task_name, run_time: QTime, repeat_count: int, filename, parent=None):
@@ -528,26 +532,121 @@ class DashboardWindow(QMainWindow):
         self.monitor_status = QLabel("状态：未启动")
         self.monitor_status.setStyleSheet("font-size:16px;color:#19a3a3;")
         self.monitor_layout.addWidget(self.monitor_status)
+        self.monitor_stats_label = QLabel("画面复用率：-  OCR缓存命中率：-")
+        self.monitor_stats_label.setStyleSheet("font-size:13px;color:#888;")
+        self.monitor_layout.addWidget(self.monitor_stats_label)
         self.monitor_template_path = QLabel("当前模板：template.png")
         self.monitor_template_path.setStyleSheet("font-size:13px;color:#888;")
         self.monitor_layout.addWidget(self.monitor_template_path)
 
         # 阈值设置区（区间）
         threshold_row = QHBoxLayout()
+        self.monitor_name_input = QLineEdit()
+        self.monitor_name_input.setPlaceholderText("目标名称（可选）")
         self.threshold_min_input = QLineEdit()
         self.threshold_min_input.setPlaceholderText("最小阈值（可选）")
         self.threshold_max_input = QLineEdit()
         self.threshold_max_input.setPlaceholderText("最大阈值（可选）")
         self.save_threshold_btn = QPushButton("保存阈值")
+        threshold_row.addWidget(self.monitor_name_input)
         threshold_row.addWidget(QLabel("提醒区间："))
         threshold_row.addWidget(self.threshold_min_input)
         threshold_row.addWidget(QLabel("≤ 数值 ≤"))
         threshold_row.addWidget(self.threshold_max_input)
         threshold_row.addWidget(self.save_threshold_btn)
         self.monitor_layout.addLayout(threshold_row)
+        # 识别区域设置：相对模板左上角的偏移和尺寸，留空表示与模板区域一致
+        ocr_box_row = QHBoxLayout()
+        self.ocr_box_inputs = []
+        for placeholder in ("X偏移", "Y偏移", "宽度", "高度"):
+            box_input = QLineEdit()
+            box_input.setPlaceholderText(placeholder)
+            self.ocr_box_inputs.append(box_input)
+        ocr_box_row.addWidget(QLabel("识别区域："))
+        for box_input in self.ocr_box_inputs:
+            ocr_box_row.addWidget(box_input)
+        # OCR前的预处理预设，小字、低对比度或深底浅字的目标可选择对应预设
+        self.ocr_preset_combo = QComboBox()
+        for preset, (preset_label, _) in PRESETS.items():
+            self.ocr_preset_combo.addItem(preset_label, preset)
+        ocr_box_row.addWidget(QLabel("预处理："))
+        ocr_box_row.addWidget(self.ocr_preset_combo)
+        self.monitor_layout.addLayout(ocr_box_row)
+        # 阈值之外的告警规则，格式见alert_rules.py，留空表示只按提醒区间告警
+        rules_row = QHBoxLayout()
+        self.monitor_rules_input = QLineEdit()
+        self.monitor_rules_input.setPlaceholderText("如 rate:window=10,limit=5; consecutive:count=3; stuck:seconds=120（可选）")
+        rules_row.addWidget(QLabel("告警规则："))
+        rules_row.addWidget(self.monitor_rules_input)
+        self.monitor_layout.addLayout(rules_row)
         self.monitor_threshold = (None, None)  # (min_value, max_value)
+        # 监控目标列表，一次截图同时监控所有目标
+        self.monitor_target_table = QTableWidget(0, 5)
+        self.monitor_target_table.setHorizontalHeaderLabels(["名称", "模板", "提醒区间", "当前值", "状态"])
+        self.monitor_target_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.monitor_target_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.monitor_target_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.monitor_target_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.monitor_target_table.verticalHeader().setVisible(False)
+        self.monitor_layout.addWidget(self.monitor_target_table)
+        # 目标ID -> 表格行号
+        self.monitor_target_rows = {}
         # 监控任务ID（用于更新）
         self.current_monitor_id = None
+
+        def format_range(min_value, max_value):
+            if min_value is not None and max_value is not None:
+                return f"{min_value} ~ {max_value}"
+            elif min_value is not None:
+                return f"≥ {min_value}"
+            elif max_value is not None:
+                return f"≤ {max_value}"
+            return "不提醒"
+
+        def refresh_monitor_targets():
+            self.monitor_target_rows = {}
+            targets = self.task_manager.get_monitor_targets()
+            self.monitor_target_table.setRowCount(len(targets))
+            for row, (target_id, name, template_path, min_value, max_value, *_) in enumerate(targets):
+                self.monitor_target_rows[target_id] = row
+                self.monitor_target_table.setItem(row, 0, QTableWidgetItem(name))
+                self.monitor_target_table.setItem(row, 1, QTableWidgetItem(template_path or ""))
+                self.monitor_target_table.setItem(row, 2, QTableWidgetItem(format_range(min_value, max_value)))
+                self.monitor_target_table.setItem(row, 3, QTableWidgetItem("-"))
+                self.monitor_target_table.setItem(row, 4, QTableWidgetItem("未启动"))
+                # 把目标ID存到第一列，选中行时取用
+                self.monitor_target_table.item(row, 0).setData(Qt.UserRole, target_id)
+
+        def update_target_status(target_id, value, status):
+            row = self.monitor_target_rows.get(target_id)
+            if row is None:
+                return
+            if value:
+                self.monitor_target_table.setItem(row, 3, QTableWidgetItem(value))
+            self.monitor_target_table.setItem(row, 4, QTableWidgetItem(status))
+
+        def select_monitor_target():
+            items = self.monitor_target_table.selectedItems()
+            if not items:
+                return
+            row = items[0].row()
+            target_id = self.monitor_target_table.item(row, 0).data(Qt.UserRole)
+            for tid, name, template_path, min_value, max_value, *rest in self.task_manager.get_monitor_targets():
+                if tid == target_id:
+                    self.current_monitor_id = tid
+                    self.monitor_name_input.setText(name)
+                    self.threshold_min_input.setText("" if min_value is None else str(min_value))
+                    self.threshold_max_input.setText("" if max_value is None else str(max_value))
+                    for box_input, box_value in zip(self.ocr_box_inputs, rest[3:7]):
+                        box_input.setText("" if box_value is None else str(box_value))
+                    self.ocr_preset_combo.setCurrentIndex(max(0, self.ocr_preset_combo.findData(rest[7] or 'none')))
+                    self.monitor_rules_input.setText(format_rules(self.task_manager.get_monitor_rules(tid)))
+                    self.monitor_selected_template = template_path
+                    self.monitor_template_unsaved = False
+                    self.monitor_template_path.setText(f"当前模板：{template_path}")
+                    break
+        self.monitor_target_table.itemSelectionChanged.connect(select_monitor_target)
+        self.refresh_monitor_targets = refresh_monitor_targets
         def save_threshold():
             min_text = self.threshold_min_input.text().strip()
             max_text = self.threshold_max_input.text().strip()
@@ -556,14 +655,34 @@ class DashboardWindow(QMainWindow):
             if min_value is not None and max_value is not None and min_value > max_value:
                 QMessageBox.warning(self, "输入错误", "最小阈值不能大于最大阈值！")
                 return
+            try:
+                ocr_box = [int(box_input.text().strip()) if box_input.text().strip() else None for box_input in self.ocr_box_inputs]
+            except ValueError:
+                QMessageBox.warning(self, "输入错误", "识别区域需填写整数像素值！")
+                return
+            try:
+                rules = parse_rules(self.monitor_rules_input.text())
+            except ValueError as e:
+                QMessageBox.warning(self, "输入错误", f"告警规则有误：{e}")
+                return
             self.monitor_threshold = (min_value, max_value)
-            name = "默认监控任务"  # 可扩展为用户输入
+            name = self.monitor_name_input.text().strip() or "默认监控任务"
             template_path = getattr(self, 'monitor_selected_template', 'template.png')
             # 新增或更新monitor_thresholds表
             if self.current_monitor_id is None:
                 self.current_monitor_id = self.task_manager.add_monitor_threshold(name, template_path, min_value, max_value)
             else:
-                self.task_manager.update_monitor_threshold(self.current_monitor_id, min_threshold=min_value, max_threshold=max_value, template_path=template_path)
+                self.task_manager.update_monitor_threshold(self.current_monitor_id, min_threshold=min_value, max_threshold=max_value, template_path=template_path, name=name)
+            self.task_manager.update_monitor_ocr_box(self.current_monitor_id, *ocr_box)
+            self.task_manager.update_monitor_ocr_preset(self.current_monitor_id, self.ocr_preset_combo.currentData())
+            self.task_manager.set_monitor_rules(self.current_monitor_id, rules)
+            self.monitor_template_unsaved = False
+            refresh_monitor_targets()
+            # 监控运行中时把新配置推送给监控线程，立即生效，无需重启
+            if self.monitor_worker is not None and self.monitor_worker.isRunning():
+                for row in self.task_manager.get_monitor_targets():
+                    if row[0] == self.current_monitor_id:
+                        self.monitor_worker.update_target(row)
             msg = ""
             if min_value is not None and max_value is not None:
                 msg = f"提醒区间：{min_value} ≤ 数值 ≤ {max_value}"
@@ -578,11 +697,15 @@ class DashboardWindow(QMainWindow):
 
         btn_row = QHBoxLayout()
         self.monitor_select_btn = QPushButton("选择图片")
+        self.monitor_new_target_btn = QPushButton("新增目标")
+        self.monitor_del_target_btn = QPushButton("删除目标")
         self.monitor_start_btn = QPushButton("开始监控")
         self.monitor_stop_btn = QPushButton("停止监控")
         self.monitor_log_btn = QPushButton("查看日志")
         self.monitor_stop_btn.setEnabled(False)
         btn_row.addWidget(self.monitor_select_btn)
+        btn_row.addWidget(self.monitor_new_target_btn)
+        btn_row.addWidget(self.monitor_del_target_btn)
         btn_row.addWidget(self.monitor_start_btn)
         btn_row.addWidget(self.monitor_stop_btn)
         btn_row.addWidget(self.monitor_log_btn)
@@ -590,28 +713,89 @@ class DashboardWindow(QMainWindow):
 
         self.monitor_worker = None
         self.monitor_selected_template = 'template.png'  # 默认
+        # 用"选择图片"选了新模板但还没有保存到监控目标
+        self.monitor_template_unsaved = False
 
         def select_template():
             file_path, _ = QFileDialog.getOpenFileName(self, "选择模板图片", "", "图片文件 (*.png *.jpg *.bmp)")
             if file_path:
                 self.monitor_template_path.setText(f"当前模板：{file_path}")
                 self.monitor_selected_template = file_path
+                self.monitor_template_unsaved = True
+
+        def new_monitor_target():
+            # 清空编辑区，下次保存阈值时新增一条目标
+            self.current_monitor_id = None
+            self.monitor_target_table.clearSelection()
+            self.monitor_name_input.clear()
+            self.threshold_min_input.clear()
+            self.threshold_max_input.clear()
+            for box_input in self.ocr_box_inputs:
+                box_input.clear()
+            self.ocr_preset_combo.setCurrentIndex(0)
+            self.monitor_rules_input.clear()
+
+        def delete_monitor_target():
+            if self.current_monitor_id is None:
+                QMessageBox.information(self, "提示", "请先在列表中选择要删除的目标")
+                return
+            self.task_manager.remove_monitor_threshold(self.current_monitor_id)
+            if self.monitor_worker is not None and self.monitor_worker.isRunning():
+                self.monitor_worker.remove_target(self.current_monitor_id)
+            new_monitor_target()
+            refresh_monitor_targets()
 
         def start_monitor():
             template_path = getattr(self, 'monitor_selected_template', 'template.png')
-            # 启动监控前清空日志
-            try:
-                with open('monitor_log.txt', 'w', encoding='utf-8') as f:
-                    f.write('')
-            except Exception as e:
-                pass
+            # 未保存过阈值时也登记监控目标，用于记录模板最后匹配位置；
+            # 新选择的模板还没保存时，未选中目标则新增一个目标，选中了目标则替换该目标的模板，保证监控的就是所选图片
+            if self.current_monitor_id is None and (self.monitor_template_unsaved or not self.task_manager.get_monitor_targets()):
+                name = self.monitor_name_input.text().strip() or "默认监控任务"
+                self.current_monitor_id = self.task_manager.add_monitor_threshold(name, template_path)
+            elif self.monitor_template_unsaved:
+                self.task_manager.update_monitor_threshold(self.current_monitor_id, template_path=template_path)
+            self.monitor_template_unsaved = False
             if self.monitor_worker is None or not self.monitor_worker.isRunning():
-                self.monitor_worker = MonitorWorker(template_path=template_path)
+                refresh_monitor_targets()
+                # 截图后端、OCR进程数等可在monitor_config.json中配置
+                try:
+                    config = load_monitor_config()
+                    # 界面中的监控目标来自数据库，配置文件中给命令行用的targets不生效
+                    config.pop('targets', None)
+                    # separate_process为true时监控引擎运行在独立子进程中，界面不受截图和OCR负载影响
+                    worker_class = MonitorProcessWorker if config.pop('separate_process', False) else MonitorWorker
+                    self.monitor_worker = worker_class(**config)
+                except (TypeError, ValueError) as e:
+                    QMessageBox.warning(self, "配置错误", f"monitor_config.json有误：{e}")
+                    return
                 self.monitor_worker.status_signal.connect(lambda s: self.monitor_status.setText(f"状态：{s}"))
+                self.monitor_worker.target_status_signal.connect(update_target_status)
+                self.monitor_worker.stats_signal.connect(update_monitor_stats)
+                # 回放结束等情况下监控会自行退出，恢复按钮状态
+                self.monitor_worker.finished.connect(lambda: (self.monitor_start_btn.setEnabled(True),
+                                                              self.monitor_stop_btn.setEnabled(False)))
                 self.monitor_worker.start()
                 self.monitor_start_btn.setEnabled(False)
                 self.monitor_stop_btn.setEnabled(True)
 
+        def update_monitor_stats(st):
+            text = (f"画面复用率：{st['frame_skip_ratio']:.0%}  OCR缓存命中率：{st['ocr_hit_ratio']:.0%}"
+                    f"（命中{st['ocr_hits']}/未命中{st['ocr_misses']}）  "
+                    f"OCR[{st['ocr_backend']}] 平均{st['ocr_latency']['avg_ms']:.1f}ms P95 {st['ocr_latency']['p95_ms']:.1f}ms")
+            # 流水线各阶段：队列深度、丢弃帧数、平均耗时
+            stages = "  ".join(f"{name} 队列{s['depth']} 丢弃{s['dropped']} {s['avg_ms']:.1f}ms"
+                               for name, s in st.get('stages', {}).items())
+            # 各环节耗时直方图估算的P50/P95，以及未找到目标、识别失败、告警次数
+            metrics = st.get('metrics', {})
+            timings = "  ".join(f"{name} {s['p50_ms']:.1f}/{s['p95_ms']:.1f}ms"
+                                for name, s in metrics.get('stages', {}).items())
+            counters = metrics.get('counters', {})
+            if timings:
+                timings = (f"耗时P50/P95：{timings}  未找到{counters.get('monitor_target_misses_total', 0)}次 "
+                           f"无法识别{counters.get('monitor_parse_failures_total', 0)}次 "
+                           f"告警{counters.get('monitor_alerts_total', 0)}次")
+            self.monitor_stats_label.setText("\n".join(part for part in (text, stages, timings) if part))
+
         def stop_monitor():
             if self.monitor_worker and self.monitor_worker.isRunning():
                 self.monitor_worker.stop()
@@ -624,6 +808,8 @@ class DashboardWindow(QMainWindow):
             dlg.exec_()
 
         self.monitor_select_btn.clicked.connect(select_template)
+        self.monitor_new_target_btn.clicked.connect(new_monitor_target)
+        self.monitor_del_target_btn.clicked.connect(delete_monitor_target)
         self.monitor_start_btn.clicked.connect(start_monitor)
         self.monitor_stop_btn.clicked.connect(stop_monitor)
         self.monitor_log_btn.clicked.connect(show_monitor_log)
@@ -710,6 +896,8 @@ class DashboardWindow(QMainWindow):
         self.load_history_tasks_from_db()
         # 启动时加载录迹任务
         self.load_record_tasks_from_db()
+        # 启动时加载监控目标
+        self.refresh_monitor_targets()
         self.start_record_btn.clicked.connect(self.handle_start_record)
         self.stop_record_btn.clicked.connect(self.handle_stop_record)
         self.current_record_task = None  # 当前录制的任务对象
@@ -872,7 +1060,8 @@ class DashboardWindow(QMainWindow):
             self.monitor_status.setFont(QFont("Microsoft YaHei UI", monitor_status_font))
         if hasattr(self, 'monitor_template_path'):
             self.monitor_template_path.setFont(QFont("Microsoft YaHei UI", max(12, int(base * 0.015))))
-        for btn in [getattr(self, 'monitor_start_btn', None), getattr(self, 'monitor_stop_btn', None), getattr(self, 'monitor_log_btn', None), getattr(self, 'monitor_select_btn', None)]:
+        for btn in [getattr(self, 'monitor_start_btn', None), getattr(self, 'monitor_stop_btn', None), getattr(self, 'monitor_log_btn', None), getattr(self, 'monitor_select_btn', None),
+                    getattr(self, 'monitor_new_target_btn', None), getattr(self, 'monitor_del_target_btn', None)]:
             if btn:
                 btn.setFont(QFont("Microsoft YaHei UI", monitor_btn_font))
                 btn.setFixedHeight(monitor_btn_height)
@@ -1245,9 +1434,11 @@ class DashboardWindow(QMainWindow):
             self.refresh_status_table()
 
     def closeEvent(self, event):
-        # 关闭时清空monitor_thresholds表
-        self.task_manager.conn.execute('DELETE FROM monitor_thresholds')
-        self.task_manager.conn.commit()
+        # 监控目标、匹配位置等配置保存在monitor_thresholds中，关闭时不再清空，重新打开程序后继续使用；
+        # 只需停止运行中的监控，日志和数值写完再退出
+        if self.monitor_worker is not None and self.monitor_worker.isRunning():
+            self.monitor_worker.stop()
+            self.monitor_worker.wait()
         super().closeEvent(event)
 
 class LogViewerDialog(QDialog):
@@ -1256,6 +1447,7 @@ class LogViewerDialog(QDialog):
         self.setWindowTitle("监控日志")
         self.resize(600, 400)
         self.log_file = log_file
+        self.tail_bytes = 256 * 1024
         layout = QVBoxLayout(self)
         self.text_edit = QTextEdit()
         self.text_edit.setReadOnly(True)
@@ -1266,9 +1458,15 @@ class LogViewerDialog(QDialog):
         self.refresh_log()
 
     def refresh_log(self):
+        # 日志会跨会话保留并持续增长，只读取末尾一段
         try:
-            with open(self.log_file, 'r', encoding='utf-8') as f:
-                log_content = f.read()
+            with open(self.log_file, 'rb') as f:
+                f.seek(0, 2)
+                size = f.tell()
+                f.seek(max(0, size - self.tail_bytes))
+                log_content = f.read().decode('utf-8', errors='ignore')
+            if size > self.tail_bytes:
+                log_content = log_content.split('\n', 1)[-1]
         except Exception as e:
             log_content = f"日志读取失败：{e}"
         scrollbar = self.text_edit.verticalScrollBar()
@@ -1290,4 +1488,6 @@ def main():
     sys.exit(app.exec_())
 
 if __name__ == '__main__':
+    # 打包后多进程OCR的子进程需要
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -0,0 +1,192 @@
+import queue
+import threading
+import time
+
+from alert_rules import RuleSet
+from notifier import play_sound
+from poll_scheduler import threshold_band
+
+
+class _AlertState:
+    def __init__(self):
+        self.alarm = False
+        self.out_since = None
+        self.last_alert = None
+        self.last_status = None
+        self.last_emit = 0.0
+        self.pending = None
+
+
+class AlertDispatcher:
+    """
+    独立线程中的告警分发器。监控线程只调用submit()把读数入队，判断、播放声音、发状态都在本线程完成，
+    告警声音不会阻塞监控循环。
+    - 去抖(debounce)：数值持续超限debounce秒后才进入告警
+    - 回差(hysteresis)：进入告警后，数值需回到区间内并离开边界hysteresis比例的距离才解除，避免在边界来回抖动
+    - 重复提醒(realert_interval)：告警持续期间每隔realert_interval秒再提醒一次，<=0表示只提醒一次
+    - 状态合并(coalesce_interval)：同一目标的状态回调至多每coalesce_interval秒一次，只发送最新状态
+    - 告警规则(set_rules)：阈值之外的变化速率、滑动平均、连续超限、数值卡住等规则（见alert_rules.py），
+      在本线程中随读数增量判断，规则由正常变为违反时提醒一次
+    on_status(target_id, value_text, status)、on_alert(target_id, label, value[, reason])均在分发线程中调用，
+    规则触发的提醒会额外传入reason（规则说明）。
+    metrics为MonitorMetrics时记录告警判断耗时（alert阶段，不含播放声音）和告警次数。
+    """
+    def __init__(self, on_status=None, on_alert=None, sound='y1478.wav', debounce=1.0, hysteresis=0.02,
+                 realert_interval=30.0, coalesce_interval=1.0, metrics=None):
+        self.metrics = metrics
+        self.on_status = on_status
+        self.on_alert = on_alert
+        self.sound = sound
+        self.defaults = {'debounce': debounce, 'hysteresis': hysteresis, 'realert_interval': realert_interval}
+        self.coalesce_interval = coalesce_interval
+        self.alerts_fired = 0
+        self._overrides = {}
+        self._rules = {}
+        self._states = {}
+        self._queue = queue.Queue()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='alert-dispatcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self):
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+
+    def configure(self, target_id, **options):
+        """
+        为单个目标覆盖debounce / hysteresis / realert_interval
+        """
+        self._queue.put(('configure', target_id, options))
+
+    def submit(self, target_id, label, value, value_text, min_threshold, max_threshold, ts=None):
+        self._queue.put(('value', target_id, (label, value, value_text, min_threshold, max_threshold,
+                                              time.time() if ts is None else ts)))
+
+    def set_rules(self, target_id, rules):
+        """
+        替换目标的告警规则（AlertRule列表），为空时移除；规则的窗口状态重新开始累积
+        """
+        self._queue.put(('rules', target_id, RuleSet(rules) if rules else None))
+
+    def invalidate(self, target_id):
+        """
+        目标状态被其它来源（如“未找到”）覆盖后调用，下一次读数会重新发送状态
+        """
+        self._queue.put(('invalidate', target_id, None))
+
+    def is_alarm(self, target_id):
+        state = self._states.get(target_id)
+        return bool(state and state.alarm)
+
+    def _option(self, target_id, name):
+        return self._overrides.get(target_id, {}).get(name, self.defaults[name])
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                kind, target_id, payload = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                kind = None
+            if kind == 'value':
+                start = time.perf_counter()
+                fire = self._evaluate(target_id, *payload)
+                if self.metrics is not None:
+                    self.metrics.observe('alert', time.perf_counter() - start)
+                    if fire:
+                        self.metrics.inc('monitor_alerts_total')
+                if fire and self.sound:
+                    play_sound(self.sound)
+            elif kind == 'configure':
+                self._overrides.setdefault(target_id, {}).update(payload)
+            elif kind == 'rules':
+                if payload is None:
+                    self._rules.pop(target_id, None)
+                else:
+                    self._rules[target_id] = payload
+            elif kind == 'invalidate':
+                state = self._states.get(target_id)
+                if state:
+                    state.last_status = None
+            self._flush_pending()
+
+    def _evaluate(self, target_id, label, value, value_text, min_threshold, max_threshold, ts):
+        """
+        更新目标的告警状态并发送状态，返回是否需要提醒
+        """
+        state = self._states.setdefault(target_id, _AlertState())
+        out_of_range = ((min_threshold is not None and value < min_threshold) or
+                        (max_threshold is not None and value > max_threshold))
+        if out_of_range:
+            if state.out_since is None:
+                state.out_since = ts
+        else:
+            state.out_since = None
+        fire = False
+        if not state.alarm:
+            if out_of_range and ts - state.out_since >= self._option(target_id, 'debounce'):
+                state.alarm = True
+                fire = True
+        elif not out_of_range:
+            band = threshold_band(min_threshold, max_threshold, self._option(target_id, 'hysteresis')) or 0
+            inside = ((min_threshold is None or value >= min_threshold + band) and
+                      (max_threshold is None or value <= max_threshold - band))
+            if inside:
+                state.alarm = False
+                state.last_alert = None
+        else:
+            realert = self._option(target_id, 'realert_interval')
+            fire = realert > 0 and ts - state.last_alert >= realert
+        if fire:
+            state.last_alert = ts
+            self.alerts_fired += 1
+            if self.on_alert:
+                self.on_alert(target_id, label, value)
+        rules = self._rules.get(target_id)
+        active = ()
+        if rules is not None:
+            fired, active = rules.evaluate(value, ts, min_threshold, max_threshold)
+            if fired:
+                self.alerts_fired += len(fired)
+                # 阈值告警已经提醒过时不再重复提醒
+                if self.on_alert and not fire:
+                    self.on_alert(target_id, label, value, '，'.join(rule.describe() for rule in fired))
+                fire = True
+        if state.alarm:
+            status = f'数值超出阈值: {value}'
+        elif active:
+            status = '规则告警: ' + '，'.join(rule.describe() for rule in active)
+        elif out_of_range:
+            status = '超出阈值（确认中）'
+        else:
+            status = '正常'
+        self._queue_status(target_id, state, value_text, status, force=fire)
+        return fire
+
+    def _queue_status(self, target_id, state, value_text, status, force=False):
+        if status == state.last_status and not force and state.pending is None:
+            return
+        state.pending = (value_text, status)
+        if force or time.monotonic() - state.last_emit >= self.coalesce_interval:
+            self._emit(target_id, state)
+
+    def _flush_pending(self):
+        now = time.monotonic()
+        for target_id, state in self._states.items():
+            if state.pending is not None and now - state.last_emit >= self.coalesce_interval:
+                self._emit(target_id, state)
+
+    def _emit(self, target_id, state):
+        value_text, status = state.pending
+        state.pending = None
+        state.last_status = status
+        state.last_emit = time.monotonic()
+        if self.on_status:
+            self.on_status(target_id, value_text, status)
@@ -0,0 +1,271 @@
+"""
+监控告警规则：在阈值区间之外，按每个目标配置的规则对读数流做增量判断。
+每来一个读数，各规则只做常数时间（均摊）的更新：时间窗口用双端队列加滑动求和，窗口内最值用单调队列，
+连续超限只维护一个计数，因此上百条规则的单次开销也可以忽略。
+
+规则类型（kind）及参数：
+- rate：window秒内的变化速率（单位/秒）超过limit，direction为up / down / both
+- average：window秒内的滑动平均值超出[min, max]
+- consecutive：连续count次读数超出[min, max]，min/max都不填时使用目标的阈值区间
+- stuck：seconds秒内读数的波动不超过tolerance（数值卡住不动）
+
+界面中用文本表示一组规则，规则之间用分号分隔，例如：
+    rate:window=10,limit=5; average:window=60,max=80; consecutive:count=3; stuck:seconds=120
+"""
+from collections import deque
+
+
+class RollingWindow:
+    """
+    按时间滑动的窗口：保留覆盖最近seconds秒的读数（额外保留一个恰好在窗口起点之前的读数，使跨度不小于seconds），
+    维护读数之和以及最小、最大值的单调队列，push均摊O(1)，查询O(1)
+    """
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.sum = 0.0
+        self._items = deque()
+        self._min = deque()
+        self._max = deque()
+
+    def push(self, ts, value):
+        self._items.append((ts, value))
+        self.sum += value
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((ts, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((ts, value))
+        boundary = ts - self.seconds
+        while len(self._items) > 1 and self._items[1][0] <= boundary:
+            self.sum -= self._items.popleft()[1]
+        if len(self._items) == 1:
+            # 只剩一个读数时重置，避免浮点累加误差持续积累
+            self.sum = value
+        oldest_ts = self._items[0][0]
+        while self._min[0][0] < oldest_ts:
+            self._min.popleft()
+        while self._max[0][0] < oldest_ts:
+            self._max.popleft()
+
+    @property
+    def count(self):
+        return len(self._items)
+
+    @property
+    def oldest(self):
+        return self._items[0]
+
+    @property
+    def span(self):
+        return self._items[-1][0] - self._items[0][0] if self._items else 0.0
+
+    @property
+    def full(self):
+        # 读数已覆盖整个窗口，窗口刚开始时不做判断，避免启动时误报
+        return self.span >= self.seconds
+
+    @property
+    def mean(self):
+        return self.sum / len(self._items)
+
+    @property
+    def min(self):
+        return self._min[0][1]
+
+    @property
+    def max(self):
+        return self._max[0][1]
+
+
+def _outside(value, low, high):
+    return (low is not None and value < low) or (high is not None and value > high)
+
+
+def _range_text(low, high):
+    if low is not None and high is not None:
+        return f'{low}~{high}'
+    return f'≥{low}' if low is not None else f'≤{high}'
+
+
+class AlertRule:
+    """
+    规则基类。update()返回本次读数后规则是否处于违反状态；由RuleSet负责边沿触发
+    """
+    kind = ''
+
+    def update(self, value, ts, min_threshold, max_threshold):
+        raise NotImplementedError
+
+    def describe(self):
+        raise NotImplementedError
+
+
+class RateOfChangeRule(AlertRule):
+    kind = 'rate'
+
+    def __init__(self, window, limit, direction='both'):
+        if window <= 0 or limit <= 0:
+            raise ValueError('rate规则的window和limit必须大于0')
+        if direction not in ('up', 'down', 'both'):
+            raise ValueError('direction只能是up、down或both')
+        self.limit = limit
+        self.direction = direction
+        self.window = RollingWindow(window)
+        self.rate = 0.0
+
+    def update(self, value, ts, min_threshold, max_threshold):
+        self.window.push(ts, value)
+        if not self.window.full:
+            return False
+        self.rate = (value - self.window.oldest[1]) / self.window.span
+        if self.direction == 'up':
+            return self.rate > self.limit
+        if self.direction == 'down':
+            return self.rate < -self.limit
+        return abs(self.rate) > self.limit
+
+    def describe(self):
+        return f'{self.window.seconds}秒内变化过快（{self.rate:+.3g}/秒）'
+
+
+class MovingAverageRule(AlertRule):
+    kind = 'average'
+
+    def __init__(self, window, min=None, max=None):
+        if window <= 0:
+            raise ValueError('average规则的window必须大于0')
+        if min is None and max is None:
+            raise ValueError('average规则至少需要min或max')
+        self.low, self.high = min, max
+        self.window = RollingWindow(window)
+
+    def update(self, value, ts, min_threshold, max_threshold):
+        self.window.push(ts, value)
+        return self.window.full and _outside(self.window.mean, self.low, self.high)
+
+    def describe(self):
+        return f'{self.window.seconds}秒均值{self.window.mean:.3g}超出{_range_text(self.low, self.high)}'
+
+
+class ConsecutiveRule(AlertRule):
+    kind = 'consecutive'
+
+    def __init__(self, count, min=None, max=None):
+        if count < 1:
+            raise ValueError('consecutive规则的count必须不小于1')
+        self.count = int(count)
+        self.low, self.high = min, max
+        self.run = 0
+
+    def update(self, value, ts, min_threshold, max_threshold):
+        if self.low is None and self.high is None:
+            out = _outside(value, min_threshold, max_threshold)
+        else:
+            out = _outside(value, self.low, self.high)
+        self.run = self.run + 1 if out else 0
+        return self.run >= self.count
+
+    def describe(self):
+        return f'连续{self.run}次超出阈值'
+
+
+class StuckRule(AlertRule):
+    kind = 'stuck'
+
+    def __init__(self, seconds, tolerance=0):
+        if seconds <= 0:
+            raise ValueError('stuck规则的seconds必须大于0')
+        self.tolerance = tolerance
+        self.window = RollingWindow(seconds)
+
+    def update(self, value, ts, min_threshold, max_threshold):
+        self.window.push(ts, value)
+        return self.window.full and self.window.max - self.window.min <= self.tolerance
+
+    def describe(self):
+        return f'数值{self.window.seconds}秒未变化'
+
+
+RULE_TYPES = {rule.kind: rule for rule in (RateOfChangeRule, MovingAverageRule, ConsecutiveRule, StuckRule)}
+
+
+def create_rule(kind, **params):
+    """
+    按类型和参数创建规则，类型未知或参数不正确时抛出ValueError
+    """
+    if kind not in RULE_TYPES:
+        raise ValueError(f'未知的告警规则: {kind}（可选: {", ".join(RULE_TYPES)}）')
+    params = {name: value for name, value in params.items() if value is not None}
+    try:
+        return RULE_TYPES[kind](**params)
+    except TypeError as e:
+        raise ValueError(f'{kind}规则参数有误: {e}') from None
+
+
+class RuleSet:
+    """
+    单个目标的一组规则。规则由正常变为违反时触发一次，恢复后才会再次触发
+    """
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self._active = [False] * len(self.rules)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def evaluate(self, value, ts, min_threshold=None, max_threshold=None):
+        """
+        返回(本次新触发的规则列表, 当前处于违反状态的规则列表)
+        """
+        fired, active = [], []
+        for i, rule in enumerate(self.rules):
+            violated = rule.update(value, ts, min_threshold, max_threshold)
+            if violated:
+                active.append(rule)
+                if not self._active[i]:
+                    fired.append(rule)
+            self._active[i] = violated
+        return fired, active
+
+
+def _number(text):
+    try:
+        value = float(text)
+    except ValueError:
+        return text
+    return int(value) if value.is_integer() and '.' not in text else value
+
+
+def parse_rules(text):
+    """
+    把界面中的规则文本解析为[{'kind': ..., 参数...}, ...]，并校验每条规则。格式有误时抛出ValueError
+    """
+    rules = []
+    for part in (text or '').replace('；', ';').split(';'):
+        part = part.strip()
+        if not part:
+            continue
+        kind, _, args = part.partition(':')
+        config = {'kind': kind.strip()}
+        for arg in args.replace('，', ',').split(','):
+            if not arg.strip():
+                continue
+            name, sep, value = arg.partition('=')
+            if not sep:
+                raise ValueError(f'规则参数应写成 名称=值: {arg.strip()}')
+            config[name.strip()] = _number(value.strip())
+        create_rule(**config)
+        rules.append(config)
+    return rules
+
+
+def format_rules(rules):
+    """
+    parse_rules的逆操作，值为None的参数省略
+    """
+    parts = []
+    for config in rules:
+        args = ','.join(f'{name}={value}' for name, value in config.items() if name != 'kind' and value is not None)
+        parts.append(f'{config["kind"]}:{args}' if args else config['kind'])
+    return '; '.join(parts)
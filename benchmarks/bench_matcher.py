@@ -0,0 +1,73 @@
+"""
+金字塔模板匹配与穷举搜索的对比测试。
+在合成的桌面截图上随机截取模板，分别用两种方式搜索，统计耗时、加速比以及定位是否一致。
+
+用法：python benchmarks/bench_matcher.py --width 3840 --height 2160 --levels 0 1 2 3
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from template_matcher import TemplateMatcher  # noqa: E402
+
+
+def synthetic_screen(width, height, seed=0):
+    # 模糊噪声背景 + 随机色块和文字，模拟桌面界面
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(0, 256, (height, width), dtype=np.uint8)
+    frame = cv2.GaussianBlur(frame, (9, 9), 0)
+    for _ in range(200):
+        x, y = int(rng.integers(0, width - 200)), int(rng.integers(0, height - 60))
+        w, h = int(rng.integers(40, 200)), int(rng.integers(20, 60))
+        cv2.rectangle(frame, (x, y), (x + w, y + h), int(rng.integers(0, 256)), -1)
+        cv2.putText(frame, str(int(rng.integers(0, 100000))), (x + 4, y + h - 6),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, int(rng.integers(0, 256)), 1)
+    return frame
+
+
+def timed(func, frame, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(frame)
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='金字塔模板匹配基准测试')
+    parser.add_argument('--width', type=int, default=3840)
+    parser.add_argument('--height', type=int, default=2160)
+    parser.add_argument('--templates', type=int, default=10, help='随机截取的模板数量')
+    parser.add_argument('--size', type=int, nargs=2, default=[120, 40], metavar=('W', 'H'), help='模板尺寸')
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 2, 3])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    frame = synthetic_screen(args.width, args.height)
+    rng = np.random.default_rng(1)
+    tw, th = args.size
+    positions = [(int(rng.integers(0, args.width - tw)), int(rng.integers(0, args.height - th)))
+                 for _ in range(args.templates)]
+    print(f'帧尺寸 {args.width}x{args.height}，模板 {tw}x{th}，共 {len(positions)} 个')
+    print(f'{"层数":>4} {"穷举(ms)":>10} {"金字塔(ms)":>10} {"加速比":>8} {"定位一致":>8}')
+    for levels in args.levels:
+        exhaustive_total, pyramid_total, agree = 0.0, 0.0, 0
+        for x, y in positions:
+            template = frame[y:y + th, x:x + tw].copy()
+            matcher = TemplateMatcher(template, track=False, pyramid_levels=levels)
+            t_ex, (_, loc_ex) = timed(matcher.match_exhaustive, frame, args.repeat)
+            t_py, (_, loc_py) = timed(matcher.match_pyramid, frame, args.repeat)
+            exhaustive_total += t_ex
+            pyramid_total += t_py
+            agree += loc_ex == loc_py
+        n = len(positions)
+        print(f'{levels:>4} {exhaustive_total / n * 1000:>10.2f} {pyramid_total / n * 1000:>10.2f} '
+              f'{exhaustive_total / pyramid_total:>7.1f}x {agree:>4}/{n}')
+
+
+if __name__ == '__main__':
+    main()
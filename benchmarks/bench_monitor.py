@@ -0,0 +1,281 @@
+"""
+监控循环的无界面基准测试。
+合成桌面截图（随机界面噪声 + 已知位置的数值控件），不需要显示器，直接调用MonitorEngine的
+匹配、OCR、阈值处理各阶段，统计帧率、各阶段P50/P95/P99耗时和峰值内存，可在多种分辨率下对比。
+OCR默认使用在合成字体上训练的字形识别器，不依赖tesseract；--ocr auto可换成tesseract后端，
+再加--mosaic对比拼图批量识别与逐张识别。
+
+用法：
+    python benchmarks/bench_monitor.py --out bench.json
+    python benchmarks/bench_monitor.py --baseline bench.json --out bench_new.json
+与基线相比帧率下降或P95耗时上升超过--tolerance时返回码为1。
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from alert_dispatcher import AlertDispatcher  # noqa: E402
+from change_gate import FrameChangeDetector, OcrResultCache  # noqa: E402
+from digit_recognizer import GlyphRecognizer  # noqa: E402
+from log_writer import AsyncLogWriter  # noqa: E402
+from monitor_engine import MonitorEngine  # noqa: E402
+from ocr_engine import MosaicOcrEngine, OcrEngine, create_ocr_engine  # noqa: E402
+from task_manager import TaskManager  # noqa: E402
+from value_store import MonitorValueWriter  # noqa: E402
+from bench_matcher import synthetic_screen  # noqa: E402
+
+RESOLUTIONS = ['1280x720', '1920x1080', '3840x2160']
+STAGES = ['capture', 'match', 'ocr', 'threshold']
+TEMPLATE_SIZE = (120, 40)
+VALUE_BOX = (110, 40)
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+def render_value(image, box, text):
+    # 数值控件：黑底白字，与训练字形所用的字体一致
+    x, y, w, h = box
+    image[y:y + h, x:x + w] = 0
+    cv2.putText(image, text, (x + 6, y + h - 10), FONT, 0.9, (255, 255, 255), 2)
+
+
+def train_glyphs(samples=200, seed=0):
+    rng = np.random.default_rng(seed)
+    recognizer = GlyphRecognizer()
+    crops = []
+    for _ in range(samples):
+        text = f'{rng.uniform(0, 1000):.{int(rng.integers(0, 3))}f}'
+        crop = np.zeros((VALUE_BOX[1], VALUE_BOX[0]), dtype=np.uint8)
+        render_value(crop, (0, 0) + VALUE_BOX, text)
+        crops.append((crop, text))
+    recognizer.fit(crops)
+    return recognizer
+
+
+class GlyphOnlyEngine(OcrEngine):
+    # 只用字形识别，不回退到tesseract，保证基准测试不依赖外部程序
+    name = 'glyph'
+
+    def __init__(self, recognizer):
+        super().__init__()
+        self.recognizer = recognizer
+
+    def _recognize(self, image):
+        return self.recognizer.recognize(image)[0]
+
+
+class SyntheticScreen:
+    """
+    合成屏幕：RGB背景上放置n个控件，每个控件由固定的标签区域（作为模板）和右侧的数值框组成
+    """
+    def __init__(self, width, height, targets, seed=0):
+        gray = synthetic_screen(width, height, seed)
+        self.rgb = cv2.cvtColor(gray, cv2.COLOR_GRAY2RGB)
+        rng = np.random.default_rng(seed + 1)
+        tw, th = TEMPLATE_SIZE
+        vw, vh = VALUE_BOX
+        cols = max(1, (width - 20) // (tw + vw + 20))
+        self.widgets = []
+        for i in range(targets):
+            # 控件排成网格，避免相互重叠
+            x = 10 + (i % cols) * (tw + vw + 20)
+            y = 10 + (i // cols) * (th + 20)
+            if y + th > height:
+                raise ValueError(f'{width}x{height}放不下{targets}个控件')
+            label = (rng.integers(0, 256, (th, tw)).astype(np.uint8))
+            label = cv2.GaussianBlur(label, (5, 5), 0)
+            cv2.putText(label, f'T{i}', (6, th - 10), FONT, 0.9, 255, 2)
+            self.rgb[y:y + th, x:x + tw] = label[..., None]
+            self.widgets.append({'template': label, 'pos': (x, y), 'value_box': (x + tw, y, vw, vh)})
+        self.values = [None] * targets
+
+    def update(self, rng, change_ratio):
+        # 按比例随机改变部分控件的数值
+        for i, widget in enumerate(self.widgets):
+            if self.values[i] is None or rng.random() < change_ratio:
+                self.values[i] = f'{rng.uniform(0, 100):.1f}'
+                render_value(self.rgb, widget['value_box'], self.values[i])
+
+
+def percentiles(samples):
+    arr = np.asarray(samples) * 1000
+    if arr.size == 0:
+        return {'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0}
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {'p50_ms': float(p50), 'p95_ms': float(p95), 'p99_ms': float(p99)}
+
+
+def build_monitor(workdir, screen, ocr):
+    """
+    用临时数据库创建MonitorEngine并装配各组件，不启动监控线程，由基准测试直接调用各阶段
+    """
+    db = TaskManager(os.path.join(workdir, 'tasks.db'), os.path.join(workdir, 'values.db'))
+    vw, vh = VALUE_BOX
+    for i, widget in enumerate(screen.widgets):
+        path = os.path.join(workdir, f't{i}.png')
+        cv2.imwrite(path, widget['template'])
+        db.add_monitor_threshold(f'T{i}', path, 0, 1000)
+        target_id = db.get_monitor_targets()[-1][0]
+        db.update_monitor_ocr_box(target_id, TEMPLATE_SIZE[0], 0, vw, vh)
+    monitor = MonitorEngine(log_file=os.path.join(workdir, 'monitor_log.txt'))
+    monitor.db = db
+    monitor.log_writer = AsyncLogWriter(monitor.log_file).start()
+    monitor.value_writer = MonitorValueWriter(db.values_db_path).start()
+    monitor.alerts = AlertDispatcher().start()
+    monitor.targets = monitor._load_targets(db)
+    monitor.ocr = ocr
+    monitor.change_detector = FrameChangeDetector()
+    monitor.ocr_cache = OcrResultCache(monitor.ocr_cache_size)
+    return monitor
+
+
+def close_monitor(monitor):
+    monitor.alerts.close()
+    monitor.value_writer.close()
+    monitor.log_writer.close()
+    monitor.db.conn.close()
+
+
+def run_resolution(resolution, args, ocr):
+    width, height = (int(v) for v in resolution.split('x'))
+    screen = SyntheticScreen(width, height, args.targets, seed=args.seed)
+    rng = np.random.default_rng(args.seed)
+    timings = {stage: [] for stage in STAGES}
+    correct = reads = 0
+    with tempfile.TemporaryDirectory() as workdir:
+        monitor = build_monitor(workdir, screen, ocr)
+        gray = np.empty((height, width), dtype=np.uint8)
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        for frame_no in range(args.frames + args.warmup):
+            if frame_no == args.warmup:
+                timings = {stage: [] for stage in STAGES}
+                correct = reads = 0
+                tracemalloc.reset_peak()
+                start = time.perf_counter()
+            screen.update(rng, args.change_ratio)
+            t0 = time.perf_counter()
+            # 截图阶段：与ScreenGrabber相同，RGB转灰度写入复用的缓冲区
+            cv2.cvtColor(screen.rgb, cv2.COLOR_RGB2GRAY, dst=gray)
+            frame_changed = monitor.change_detector.changed(gray)
+            t1 = time.perf_counter()
+            matches = monitor._match_targets(gray, frame_changed)
+            t2 = time.perf_counter()
+            results = monitor._read_targets(matches)
+            t3 = time.perf_counter()
+            monitor._handle_reads(results, time.time())
+            t4 = time.perf_counter()
+            for stage, elapsed in zip(STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3)):
+                timings[stage].append(elapsed)
+            for (_, _, value), expected in zip(results, screen.values):
+                reads += 1
+                correct += value == expected
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        close_monitor(monitor)
+    return {
+        'fps': args.frames / elapsed if elapsed else 0.0,
+        'accuracy': correct / reads if reads else 0.0,
+        'peak_mb': peak / (1024 * 1024),
+        'stages': {stage: percentiles(samples) for stage, samples in timings.items()},
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    与基线逐项对比，返回退化项列表
+    """
+    regressions = []
+    print(f'\n与基线对比（容差 {tolerance:.0%}）')
+    for resolution, current in results.items():
+        base = baseline.get('results', {}).get(resolution)
+        if base is None:
+            print(f'{resolution}: 基线中没有该分辨率')
+            continue
+        ratio = current['fps'] / base['fps'] if base['fps'] else 1.0
+        print(f'{resolution}: 帧率 {base["fps"]:.1f} -> {current["fps"]:.1f} ({ratio - 1:+.1%})')
+        if ratio < 1 - tolerance:
+            regressions.append(f'{resolution} fps')
+        for stage in STAGES:
+            old = base['stages'][stage]['p95_ms']
+            new = current['stages'][stage]['p95_ms']
+            # 亚毫秒级的抖动不计入退化
+            if new > old * (1 + tolerance) and new - old > 0.1:
+                print(f'  {stage} P95 {old:.2f}ms -> {new:.2f}ms')
+                regressions.append(f'{resolution} {stage} p95')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='监控循环无界面基准测试')
+    parser.add_argument('--resolutions', nargs='+', default=RESOLUTIONS, help='例如 1920x1080')
+    parser.add_argument('--targets', type=int, default=4, help='监控目标数量')
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10, help='不计入统计的预热帧数')
+    parser.add_argument('--change-ratio', type=float, default=0.2, help='每帧数值发生变化的控件比例')
+    parser.add_argument('--ocr', default='glyph', help='glyph（默认，不依赖tesseract）/ auto / tesseract-api / pytesseract')
+    parser.add_argument('--tesseract-dir', default=None)
+    parser.add_argument('--mosaic', action='store_true', help='tesseract后端把同一帧的区域拼成一张图片识别')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help='结果保存为JSON')
+    parser.add_argument('--baseline', help='用于对比的基线JSON')
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    args = parser.parse_args()
+
+    if args.ocr == 'glyph':
+        engine = GlyphOnlyEngine(train_glyphs(seed=args.seed))
+    else:
+        engine = create_ocr_engine(args.ocr, args.tesseract_dir)
+        if args.mosaic:
+            engine = MosaicOcrEngine(engine)
+
+    results = {}
+    print(f'目标 {args.targets} 个，{args.frames} 帧，OCR {engine.name}')
+    print(f'{"分辨率":>10} {"帧率":>8} {"准确率":>7} {"峰值内存":>9}  ' +
+          '  '.join(f'{stage + " P50/P95/P99(ms)":>28}' for stage in STAGES))
+    for resolution in args.resolutions:
+        result = run_resolution(resolution, args, engine)
+        results[resolution] = result
+        stage_text = '  '.join(
+            f'{s["p50_ms"]:>8.2f}/{s["p95_ms"]:>8.2f}/{s["p99_ms"]:>8.2f}'.rjust(28)
+            for s in (result['stages'][stage] for stage in STAGES))
+        print(f'{resolution:>10} {result["fps"]:>8.1f} {result["accuracy"]:>7.1%} '
+              f'{result["peak_mb"]:>7.1f}MB  {stage_text}')
+    engine.close()
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'config': {'targets': args.targets, 'frames': args.frames, 'change_ratio': args.change_ratio,
+                   'ocr': engine.name, 'seed': args.seed},
+        'results': results,
+    }
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f'结果已保存到 {args.out}')
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('config') != report['config']:
+            print('注意：基线的测试配置与本次不同，对比结果仅供参考')
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print('性能退化：' + '，'.join(regressions))
+            sys.exit(1)
+        print('未发现性能退化')
+
+
+if __name__ == '__main__':
+    main()
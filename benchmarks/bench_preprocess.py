@@ -0,0 +1,118 @@
+"""
+OCR预处理预设的基准测试。
+合成几类常见的难识别数值区域（正常、小字、低对比度、浅底深字、带噪点），对每类区域分别用
+不处理和各个预设识别，统计预处理耗时、OCR耗时和识别成功率（解析出的数值与真实值一致）。
+需要tesseract（与监控使用同样的后端选择），--ocr可指定后端。
+
+用法：
+    python benchmarks/bench_preprocess.py --samples 50 --out preprocess.json
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ocr_engine import create_ocr_engine  # noqa: E402
+from ocr_preprocess import PRESETS, get_preprocessor  # noqa: E402
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+# 场景名称 -> (区域尺寸(w, h), 背景灰度, 文字灰度, 字号, 笔画粗细, 噪点标准差)
+CASES = {
+    'normal': ((110, 40), 0, 255, 0.9, 2, 0),
+    'small': ((48, 14), 0, 255, 0.35, 1, 0),
+    'low_contrast': ((110, 40), 90, 130, 0.9, 2, 0),
+    'dark_on_light': ((110, 40), 235, 20, 0.9, 2, 0),
+    'noisy': ((110, 40), 30, 200, 0.9, 2, 25),
+}
+
+
+def render_case(case, text, rng):
+    (w, h), background, foreground, scale, thickness, noise = CASES[case]
+    crop = np.full((h, w), background, dtype=np.uint8)
+    (tw, th), _ = cv2.getTextSize(text, FONT, scale, thickness)
+    cv2.putText(crop, text, (max(1, (w - tw) // 2), (h + th) // 2), FONT, scale, foreground, thickness)
+    if noise:
+        crop = np.clip(crop + rng.normal(0, noise, crop.shape), 0, 255).astype(np.uint8)
+    return crop
+
+
+def parse(text):
+    # 与监控中的解析方式一致
+    match = re.search(r'\d+\.?\d*', text)
+    return match.group(0) if match else text.strip()
+
+
+def run_case(case, presets, engine, samples, rng):
+    values = [f'{rng.uniform(0, 1000):.{int(rng.integers(0, 3))}f}' for _ in range(samples)]
+    crops = [render_case(case, value, rng) for value in values]
+    results = {}
+    for preset in presets:
+        preprocessor = get_preprocessor(preset)
+        prep_time = ocr_time = 0.0
+        correct = 0
+        for crop, expected in zip(crops, values):
+            t0 = time.perf_counter()
+            image = crop if preprocessor is None else preprocessor(crop)
+            t1 = time.perf_counter()
+            text = engine.recognize(image)
+            t2 = time.perf_counter()
+            prep_time += t1 - t0
+            ocr_time += t2 - t1
+            correct += parse(text) == expected
+        results[preset] = {
+            'success': correct / samples,
+            'preprocess_ms': prep_time / samples * 1000,
+            'ocr_ms': ocr_time / samples * 1000,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='OCR预处理预设基准测试')
+    parser.add_argument('--cases', nargs='+', default=list(CASES), choices=list(CASES))
+    parser.add_argument('--presets', nargs='+', default=list(PRESETS), choices=list(PRESETS))
+    parser.add_argument('--samples', type=int, default=50, help='每类区域的样本数')
+    parser.add_argument('--ocr', default='auto', help='auto / tesseract-api / pytesseract')
+    parser.add_argument('--tesseract-dir', default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help='结果保存为JSON')
+    args = parser.parse_args()
+
+    engine = create_ocr_engine(args.ocr, args.tesseract_dir)
+    rng = np.random.default_rng(args.seed)
+    results = {}
+    print(f'每类 {args.samples} 个样本，OCR {engine.name}')
+    print(f'{"场景":>14} {"预设":>14} {"成功率":>7} {"预处理(ms)":>11} {"OCR(ms)":>9}')
+    for case in args.cases:
+        results[case] = run_case(case, args.presets, engine, args.samples, rng)
+        best = max(results[case], key=lambda p: (results[case][p]['success'], -results[case][p]['ocr_ms']))
+        for preset, r in results[case].items():
+            mark = ' *' if preset == best else ''
+            print(f'{case:>14} {preset:>14} {r["success"]:>7.1%} {r["preprocess_ms"]:>11.3f} '
+                  f'{r["ocr_ms"]:>9.2f}{mark}')
+    engine.close()
+    print('* 为该场景成功率最高（相同时OCR最快）的预设')
+
+    if args.out:
+        report = {
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'config': {'samples': args.samples, 'ocr': engine.name, 'seed': args.seed},
+            'results': results,
+        }
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f'结果已保存到 {args.out}')
+
+
+if __name__ == '__main__':
+    main()
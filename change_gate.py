@@ -0,0 +1,96 @@
+import hashlib
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+class FrameChangeDetector:
+    """
+    整帧变化检测：把灰度帧按scale缩小后与上一帧比较，任意像素差超过tolerance即认为画面有变化。
+    画面未变化时可以直接复用上一次的模板匹配结果。
+    """
+    def __init__(self, scale=8, tolerance=3):
+        self.scale = scale
+        self.tolerance = tolerance
+        self._prev = None
+        self._curr = None
+        self._diff = None
+        self.changed_count = 0
+        self.unchanged_count = 0
+
+    def _buffer(self, buf, shape):
+        if buf is None or buf.shape != shape:
+            buf = np.empty(shape, dtype=np.uint8)
+        return buf
+
+    def changed(self, frame):
+        h, w = frame.shape[:2]
+        shape = (max(1, h // self.scale), max(1, w // self.scale))
+        self._curr = self._buffer(self._curr, shape)
+        cv2.resize(frame, (shape[1], shape[0]), dst=self._curr, interpolation=cv2.INTER_AREA)
+        if self._prev is None or self._prev.shape != shape:
+            changed = True
+        else:
+            self._diff = self._buffer(self._diff, shape)
+            cv2.absdiff(self._curr, self._prev, dst=self._diff)
+            changed = int(self._diff.max()) > self.tolerance
+        # 交换缓冲区，避免每帧重新分配
+        self._prev, self._curr = self._curr, self._prev
+        if changed:
+            self.changed_count += 1
+        else:
+            self.unchanged_count += 1
+        return changed
+
+    def reset(self):
+        self._prev = None
+
+    @property
+    def skip_ratio(self):
+        total = self.changed_count + self.unchanged_count
+        return self.unchanged_count / total if total else 0.0
+
+
+def region_key(region):
+    """
+    以裁剪区域的像素内容生成缓存键，尺寸也计入键中
+    """
+    digest = hashlib.blake2b(np.ascontiguousarray(region).data, digest_size=16).hexdigest()
+    return f'{region.shape[1]}x{region.shape[0]}:{digest}'
+
+
+class OcrResultCache:
+    """
+    OCR结果缓存，按区域内容哈希查找，超过maxsize时淘汰最久未使用的条目
+    """
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key in self._items:
+            self._items.move_to_end(key)
+            self.hits += 1
+            return self._items[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def clear(self):
+        self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+    @property
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
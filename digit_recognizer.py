@@ -0,0 +1,217 @@
+"""
+基于NumPy字形匹配的数字识别器。
+监控的数值通常是固定界面字体的数字，用tesseract识别大材小用。这里把裁剪区域按列投影切分成单个字形，
+缩放到统一尺寸后与少量已标注样本学到的字形做向量化相关匹配，单次识别耗时在亚毫秒级。
+
+训练：python digit_recognizer.py --out glyphs.npz samples/
+samples目录中的图片以数值命名，例如 12.5.png、3.14_2.png（下划线后的部分会被忽略）。
+"""
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
+
+from ocr_engine import OcrEngine
+
+GLYPH_W, GLYPH_H = 12, 16
+
+
+def to_binary(crop):
+    """
+    转灰度并用Otsu二值化，保证文字为前景（非零），背景为0
+    """
+    crop = np.asarray(crop)
+    if crop.ndim == 3:
+        crop = cv2.cvtColor(crop, cv2.COLOR_RGB2GRAY if crop.shape[2] == 3 else cv2.COLOR_RGBA2GRAY)
+    _, binary = cv2.threshold(crop, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    # 白色占多数说明是浅底深字，取反使文字成为前景
+    if np.count_nonzero(binary) > binary.size // 2:
+        binary = cv2.bitwise_not(binary)
+    return binary
+
+
+def segment_glyphs(binary):
+    """
+    按列投影切分字形，返回[(x0, x1), ...]以及整行文字的上下边界(y0, y1)
+    """
+    cols = np.flatnonzero(binary.any(axis=0))
+    rows = np.flatnonzero(binary.any(axis=1))
+    if cols.size == 0:
+        return [], (0, 0)
+    # 相邻有墨列之间出现空列即为字形分界
+    breaks = np.flatnonzero(np.diff(cols) > 1)
+    starts = np.concatenate(([cols[0]], cols[breaks + 1]))
+    ends = np.concatenate((cols[breaks], [cols[-1]])) + 1
+    return list(zip(starts.tolist(), ends.tolist())), (int(rows[0]), int(rows[-1]) + 1)
+
+
+def glyph_vectors(binary, spans, line):
+    """
+    把每个字形缩放到统一尺寸，展平并归一化（零均值、单位长度），返回(n, GLYPH_W*GLYPH_H)矩阵。
+    以整行高度而不是单个字形高度裁剪，保留小数点、负号等字符的相对位置信息。
+    """
+    y0, y1 = line
+    vectors = np.empty((len(spans), GLYPH_W * GLYPH_H), dtype=np.float32)
+    for i, (x0, x1) in enumerate(spans):
+        glyph = cv2.resize(binary[y0:y1, x0:x1], (GLYPH_W, GLYPH_H), interpolation=cv2.INTER_AREA)
+        vectors[i] = glyph.ravel()
+    vectors -= vectors.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    vectors /= norms
+    return vectors
+
+
+class GlyphRecognizer:
+    """
+    字形模板库：labels[i]对应templates[i]，widths[i]为样本字形的像素宽度（相对行高）
+    """
+    def __init__(self):
+        self.labels = np.empty(0, dtype='<U1')
+        self.templates = np.empty((0, GLYPH_W * GLYPH_H), dtype=np.float32)
+        self.widths = np.empty(0, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def fit(self, samples):
+        """
+        samples: [(裁剪图片, 对应文本), ...]。切分出的字形数量与文本长度不一致的样本会被跳过，返回跳过的数量。
+        """
+        labels, templates, widths = [self.labels], [self.templates], [self.widths]
+        skipped = 0
+        for crop, text in samples:
+            binary = to_binary(crop)
+            spans, line = segment_glyphs(binary)
+            if len(spans) != len(text) or line[1] <= line[0]:
+                skipped += 1
+                continue
+            labels.append(np.array(list(text), dtype='<U1'))
+            templates.append(glyph_vectors(binary, spans, line))
+            widths.append(np.array([(x1 - x0) / (line[1] - line[0]) for x0, x1 in spans], dtype=np.float32))
+        self.labels = np.concatenate(labels)
+        self.templates = np.concatenate(templates)
+        self.widths = np.concatenate(widths)
+        return skipped
+
+    def recognize(self, crop):
+        """
+        返回(文本, 置信度)。置信度为各字形最佳相关系数中的最小值，范围[-1, 1]。
+        """
+        if not len(self):
+            return '', 0.0
+        binary = to_binary(crop)
+        spans, line = segment_glyphs(binary)
+        if not spans or line[1] <= line[0]:
+            return '', 0.0
+        vectors = glyph_vectors(binary, spans, line)
+        # (字形数, 模板数)的相关系数矩阵，一次矩阵乘法完成全部比较
+        scores = vectors @ self.templates.T
+        best = scores.argmax(axis=1)
+        confidence = float(scores[np.arange(len(spans)), best].min())
+        # 字形明显比学到的最宽字形还宽，多半是粘连的多个字符
+        max_width = float(self.widths.max()) * 1.5
+        if any((x1 - x0) / (line[1] - line[0]) > max_width for x0, x1 in spans):
+            confidence = 0.0
+        return ''.join(self.labels[best]), confidence
+
+    def save(self, path):
+        np.savez(path, labels=self.labels, templates=self.templates, widths=self.widths)
+
+    @classmethod
+    def load(cls, path):
+        recognizer = cls()
+        with np.load(path) as data:
+            recognizer.labels = data['labels']
+            recognizer.templates = data['templates']
+            recognizer.widths = data['widths']
+        return recognizer
+
+
+class GlyphOcrEngine(OcrEngine):
+    """
+    优先用字形匹配识别，置信度低于min_confidence时回退到fallback引擎（tesseract）
+    """
+    name = 'glyph'
+
+    def __init__(self, recognizer, fallback, min_confidence=0.85):
+        super().__init__(fallback.psm)
+        self.name = f'glyph+{fallback.name}'
+        self.recognizer = recognizer
+        self.fallback = fallback
+        self.min_confidence = min_confidence
+        self.last_confidence = 0.0
+        self.glyph_reads = 0
+        self.fallback_reads = 0
+
+    def _recognize(self, image):
+        text, confidence = self.recognizer.recognize(image)
+        self.last_confidence = confidence
+        if confidence >= self.min_confidence:
+            self.glyph_reads += 1
+            return text
+        self.fallback_reads += 1
+        return self.fallback.recognize(image)
+
+    def recognize_many(self, images):
+        # 先全部用字形识别，置信度不足的区域再一起交给fallback，fallback可以批量识别（如拼图识别）
+        texts = [None] * len(images)
+        uncertain = []
+        for i, image in enumerate(images):
+            start = time.perf_counter()
+            text, confidence = self.recognizer.recognize(image)
+            self.last_confidence = confidence
+            if confidence >= self.min_confidence:
+                self.glyph_reads += 1
+                texts[i] = text
+                self.latency.add(time.perf_counter() - start)
+            else:
+                uncertain.append(i)
+        if uncertain:
+            self.fallback_reads += len(uncertain)
+            start = time.perf_counter()
+            for i, text in zip(uncertain, self.fallback.recognize_many([images[i] for i in uncertain])):
+                texts[i] = text
+            self.latency.add(time.perf_counter() - start)
+        return texts
+
+    def close(self):
+        self.fallback.close()
+
+
+def load_samples(sample_dir):
+    from PIL import Image
+    samples = []
+    for filename in sorted(os.listdir(sample_dir)):
+        stem, ext = os.path.splitext(filename)
+        if ext.lower() not in ('.png', '.jpg', '.bmp'):
+            continue
+        # 用PIL读取，兼容中文路径
+        image = np.array(Image.open(os.path.join(sample_dir, filename)).convert('L'))
+        samples.append((image, stem.split('_')[0]))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description='从已标注的数字截图学习字形')
+    parser.add_argument('sample_dir', help='以数值命名的截图所在目录')
+    parser.add_argument('--out', default='glyphs.npz', help='输出的字形文件')
+    args = parser.parse_args()
+    samples = load_samples(args.sample_dir)
+    recognizer = GlyphRecognizer()
+    skipped = recognizer.fit(samples)
+    recognizer.save(args.out)
+    print(f'样本 {len(samples)} 张，跳过 {skipped} 张，共学到 {len(recognizer)} 个字形 -> {args.out}')
+    # 回测一遍训练样本，给出识别耗时和准确率
+    correct = 0
+    start = time.perf_counter()
+    for crop, text in samples:
+        correct += recognizer.recognize(crop)[0] == text
+    elapsed = (time.perf_counter() - start) / max(1, len(samples))
+    print(f'回测准确率 {correct}/{len(samples)}，平均耗时 {elapsed * 1000:.3f}ms')
+
+
+if __name__ == '__main__':
+    main()
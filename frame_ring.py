@@ -0,0 +1,230 @@
+import glob
+import json
+import os
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class _Ring:
+    """
+    预分配的定长环形缓冲：images为(slots, h, w)的uint8数组，写满后覆盖最旧的一项
+    """
+    def __init__(self, slots, shape):
+        self.images = np.zeros((slots,) + shape, dtype=np.uint8)
+        # 每一项的实际尺寸（识别区域在屏幕边缘被裁剪时小于槽位尺寸）
+        self.sizes = np.zeros((slots, 2), dtype=np.int32)
+        self.ts = np.zeros(slots, dtype=np.float64)
+        self.labels = [''] * slots
+        self.count = 0
+        self.next = 0
+
+    @property
+    def slots(self):
+        return len(self.images)
+
+    @property
+    def nbytes(self):
+        return self.images.nbytes + self.sizes.nbytes + self.ts.nbytes
+
+    def slot(self, ts, size, label=''):
+        """
+        占用下一个槽位并返回其数组视图，调用方直接写入
+        """
+        i = self.next
+        self.next = (i + 1) % self.slots
+        self.count = min(self.count + 1, self.slots)
+        self.ts[i] = ts
+        self.sizes[i] = size
+        self.labels[i] = label
+        return self.images[i]
+
+    def ordered(self):
+        # 按时间从旧到新排列的下标
+        start = self.next if self.count == self.slots else 0
+        return (np.arange(self.count) + start) % self.slots
+
+    def snapshot(self):
+        order = self.ordered()
+        return {
+            'images': self.images[order],
+            'sizes': self.sizes[order],
+            'ts': self.ts[order],
+            'labels': np.array([self.labels[i] for i in order], dtype=str),
+        }
+
+
+class FrameRing:
+    """
+    内存有上限的画面回溯缓冲：每个目标保留最近crop_history个识别区域，可选保留最近frame_history张缩小的整帧。
+    所有缓冲区在第一次写入时按尺寸一次性预分配，总大小不超过max_bytes，其中整帧最多占一半；放不下时减少槽位，
+    预算用完后新的目标不再缓存（rejected计数）。线程安全。
+    """
+    def __init__(self, max_bytes=32 * 1024 * 1024, crop_history=100, frame_history=20, frame_scale=0.25):
+        self.max_bytes = max_bytes
+        self.crop_history = crop_history
+        self.frame_history = frame_history if frame_scale else 0
+        self.frame_scale = frame_scale
+        self.rejected = 0
+        self._crops = {}
+        self._frames = None
+        self._allocated = 0
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        return self._allocated
+
+    def _allocate(self, history, shape, budget=None):
+        # 按剩余预算决定槽位数，一个槽位都放不下时返回None
+        slot_bytes = int(np.prod(shape)) + 8 + 8
+        available = self.max_bytes - self._allocated
+        if budget is not None:
+            available = min(available, budget)
+        slots = min(history, available // slot_bytes)
+        if slots <= 0:
+            self.rejected += 1
+            return None
+        ring = _Ring(slots, shape)
+        self._allocated += ring.nbytes
+        return ring
+
+    def push_crop(self, target_id, ts, crop, value=None):
+        """
+        记录一个目标的识别区域。槽位尺寸取第一次写入的区域尺寸，之后更大的区域会被截断
+        """
+        if crop is None or not self.crop_history:
+            return
+        with self._lock:
+            ring = self._crops.get(target_id, False)
+            if ring is False:
+                ring = self._crops[target_id] = self._allocate(self.crop_history, crop.shape[:2])
+            if ring is None:
+                return
+            h = min(crop.shape[0], ring.images.shape[1])
+            w = min(crop.shape[1], ring.images.shape[2])
+            slot = ring.slot(ts, (h, w), '' if value is None else str(value))
+            slot[:h, :w] = crop[:h, :w]
+
+    def push_frame(self, ts, frame):
+        """
+        记录一张缩小后的整帧，直接缩放写入预分配的槽位
+        """
+        if not self.frame_history:
+            return
+        h, w = frame.shape[:2]
+        size = (max(1, int(h * self.frame_scale)), max(1, int(w * self.frame_scale)))
+        with self._lock:
+            if self._frames is None:
+                self._frames = self._allocate(self.frame_history, size,
+                                              self.max_bytes // 2 if self.crop_history else None)
+                if self._frames is None:
+                    self.frame_history = 0
+                    return
+            ring = self._frames
+            # 分辨率变化后按原槽位尺寸缩放
+            size = ring.images.shape[1:]
+            cv2.resize(frame, (size[1], size[0]), dst=ring.slot(ts, size), interpolation=cv2.INTER_AREA)
+
+    def forget(self, target_id):
+        # 目标被移除时释放其缓冲区
+        with self._lock:
+            ring = self._crops.pop(target_id, None)
+            if ring:
+                self._allocated -= ring.nbytes
+
+    def snapshot(self, target_id=None):
+        """
+        复制出按时间排序的缓冲内容。target_id为None时包含所有目标的识别区域
+        """
+        data = {}
+        with self._lock:
+            for tid, ring in self._crops.items():
+                if ring is None or (target_id is not None and tid != target_id):
+                    continue
+                for key, value in ring.snapshot().items():
+                    data[f'crop{tid}_{key}'] = value
+            if self._frames is not None:
+                for key, value in self._frames.snapshot().items():
+                    if key != 'labels':
+                        data[f'frame_{key}'] = value
+        return data
+
+
+class SnapshotWriter:
+    """
+    把FrameRing的快照异步写成压缩的npz文件，同一目标同一原因至少间隔min_interval秒，最多保留backup_count个文件
+    """
+    def __init__(self, directory='snapshots', min_interval=60.0, backup_count=100, max_queue=8):
+        self.directory = directory
+        self.min_interval = min_interval
+        self.backup_count = backup_count
+        self.written = 0
+        self.dropped = 0
+        self._last = {}
+        self._last_lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='snapshot-writer', daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self):
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+
+    def dump(self, ring, reason, target_id, label, **meta):
+        """
+        复制当前缓冲内容并入队，由后台线程压缩写盘。返回是否入队
+        """
+        # 告警在分发线程中触发，丢失目标在监控线程中触发
+        now = time.monotonic()
+        key = (target_id, reason)
+        with self._last_lock:
+            if now - self._last.get(key, -self.min_interval) < self.min_interval:
+                return False
+            self._last[key] = now
+        data = ring.snapshot(target_id)
+        data['meta'] = np.array(json.dumps({'reason': reason, 'target': label, 'ts': time.time(), **meta},
+                                           ensure_ascii=False))
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        safe_label = ''.join(c if c.isalnum() or c in '-_#' else '_' for c in label)
+        path = os.path.join(self.directory, f'{stamp}_{reason}_{safe_label}.npz')
+        try:
+            self._queue.put_nowait((path, data))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def _run(self):
+        while not self._stop_event.is_set() or not self._queue.empty():
+            try:
+                path, data = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                np.savez_compressed(path, **data)
+                self.written += 1
+                self._prune()
+            except Exception as e:
+                print("画面快照写入失败。", e)
+
+    def _prune(self):
+        files = sorted(glob.glob(os.path.join(glob.escape(self.directory), '*.npz')), key=os.path.getmtime)
+        for old in files[:max(0, len(files) - self.backup_count)]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
@@ -0,0 +1,116 @@
+import datetime
+import glob
+import gzip
+import os
+import queue
+import shutil
+import threading
+import time
+
+
+class AsyncLogWriter:
+    """
+    异步日志写入：write()只把消息放进内存队列，后台线程按时间(flush_interval)或条数(batch_size)批量写盘，
+    调用方不会阻塞在磁盘I/O上。
+    文件超过max_bytes或跨天时轮转为 monitor_log.20240101-000000.txt，可选gzip压缩，最多保留backup_count个历史文件。
+    队列满时丢弃新消息并计数，不阻塞调用方。
+    """
+    def __init__(self, path='monitor_log.txt', flush_interval=1.0, batch_size=200, max_bytes=5 * 1024 * 1024,
+                 rotate_daily=True, compress=True, backup_count=30, max_queue=10000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+        self.compress = compress
+        self.backup_count = backup_count
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._day = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+            self._thread.start()
+        return self
+
+    def write(self, msg):
+        try:
+            self._queue.put_nowait(msg)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        # 停止后台线程，并把队列里剩余的日志全部写完
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while not self._stop_event.is_set() or not self._queue.empty():
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                batch.append(self._queue.get(timeout=min(timeout, 0.2)))
+            except queue.Empty:
+                pass
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline or self._stop_event.is_set():
+                if batch:
+                    self._flush(batch)
+                    batch = []
+                deadline = time.monotonic() + self.flush_interval
+        if batch:
+            self._flush(batch)
+
+    def _flush(self, lines):
+        data = ''.join(line + '\n' for line in lines)
+        try:
+            self._maybe_rotate(len(data.encode('utf-8')))
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(data)
+            self.written += len(lines)
+        except Exception as e:
+            print("监控日志写入失败。", e)
+
+    def _maybe_rotate(self, incoming):
+        today = datetime.date.today()
+        if not os.path.exists(self.path):
+            self._day = today
+            return
+        if self._day is None:
+            # 启动时以已有日志文件的修改日期作为其内容所属日期
+            self._day = datetime.date.fromtimestamp(os.path.getmtime(self.path))
+        size = os.path.getsize(self.path)
+        if (self.rotate_daily and self._day != today) or (self.max_bytes and size + incoming > self.max_bytes):
+            self._rotate()
+            self._day = today
+
+    def _rotate(self):
+        root, ext = os.path.splitext(self.path)
+        stamp = datetime.datetime.fromtimestamp(os.path.getmtime(self.path)).strftime('%Y%m%d-%H%M%S')
+        rotated = f'{root}.{stamp}{ext}'
+        suffix = 1
+        while os.path.exists(rotated) or os.path.exists(rotated + '.gz'):
+            rotated = f'{root}.{stamp}-{suffix}{ext}'
+            suffix += 1
+        os.replace(self.path, rotated)
+        if self.compress:
+            with open(rotated, 'rb') as src, gzip.open(rotated + '.gz', 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(rotated)
+        self._prune(root, ext)
+
+    def _prune(self, root, ext):
+        backups = sorted(glob.glob(f'{glob.escape(root)}.*{ext}') + glob.glob(f'{glob.escape(root)}.*{ext}.gz'),
+                         key=os.path.getmtime)
+        for old in backups[:max(0, len(backups) - self.backup_count)]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
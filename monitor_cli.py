@@ -0,0 +1,106 @@
+"""
+监控的命令行入口，不依赖PyQt5，可在服务器或容器中运行。
+读取JSON配置文件（键与MonitorEngine的构造参数一致，另可用targets直接给出监控目标），
+把识别值、告警和状态以JSON Lines格式逐行写到标准输出或文件。
+
+配置示例：
+{
+  "capture_backend": "replay",
+  "capture_options": {"source": "recordings/", "fps": 2, "loop": false},
+  "targets": [{"name": "温度", "template": "templates/temp.png", "min": 0, "max": 80, "ocr_box": [120, 0, 60, 30]}]
+}
+未给出targets时读取db_path（默认tasks.db）中界面保存的监控目标；给出targets时识别值默认写入monitor_cli_values.db，
+匹配位置也不写回db_path，不会影响界面中同编号的目标。
+
+用法：python monitor_cli.py --config monitor_config.json [--output values.jsonl] [--no-sound] [--duration 60]
+"""
+import argparse
+import json
+import signal
+import sys
+import threading
+import time
+
+from monitor_config import load_monitor_config
+from monitor_engine import MonitorEngine
+
+
+class JsonlWriter:
+    """
+    线程安全的JSON Lines输出，每行写完立即flush，便于管道另一端实时读取
+    """
+    def __init__(self, stream):
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def write(self, event, **fields):
+        record = {'event': event, 'ts': fields.pop('ts', None) or time.time()}
+        record.update(fields)
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self.stream.write(line + '\n')
+            self.stream.flush()
+
+
+def build_engine(config, out, stats=False):
+    return MonitorEngine(
+        on_status=lambda text: out.write('status', status=text),
+        on_target_status=lambda target_id, value, status: out.write(
+            'target_status', id=target_id, value=value, status=status),
+        on_value=lambda target_id, label, ts, raw, value: out.write(
+            'value', ts=ts, id=target_id, target=label, value=value, raw=raw),
+        on_alert=lambda target_id, label, value, reason: out.write(
+            'alert', id=target_id, target=label, value=value, reason=reason),
+        on_stats=(lambda st: out.write('stats', **st)) if stats else None,
+        **config)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='无界面运行屏幕数值监控，输出JSON Lines')
+    parser.add_argument('--config', default='monitor_config.json', help='JSON配置文件')
+    parser.add_argument('--output', default='-', help='输出文件，默认标准输出')
+    parser.add_argument('--no-sound', action='store_true', help='告警时不播放声音')
+    parser.add_argument('--stats', action='store_true', help='同时输出缓存命中与耗时统计')
+    parser.add_argument('--duration', type=float, default=None, help='运行多少秒后自动停止')
+    args = parser.parse_args()
+
+    try:
+        config = load_monitor_config(args.config)
+    except (OSError, ValueError) as e:
+        print(f'配置文件读取失败: {e}', file=sys.stderr)
+        sys.exit(2)
+    # 只对界面生效的配置项（命令行本身就是独立进程），与界面忽略targets相同
+    config.pop('separate_process', None)
+    if args.no_sound:
+        config['alert_sound'] = None
+    stream = sys.stdout if args.output == '-' else open(args.output, 'a', encoding='utf-8')
+    # 各模块中的print提示改到标准错误，标准输出只保留JSON Lines
+    sys.stdout = sys.stderr
+    out = JsonlWriter(stream)
+    try:
+        engine = build_engine(config, out, args.stats)
+    except TypeError as e:
+        print(f'配置项有误: {e}', file=sys.stderr)
+        sys.exit(2)
+
+    # Ctrl+C和docker stop（SIGTERM）都让引擎正常停止，日志和数值会写完再退出
+    def request_stop(*_):
+        engine.stop()
+    signal.signal(signal.SIGINT, request_stop)
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, request_stop)
+
+    engine.start()
+    deadline = time.monotonic() + args.duration if args.duration else None
+    # 主线程用带超时的join等待，保证能及时响应信号
+    while engine.is_alive():
+        engine.join(0.5)
+        if deadline is not None and time.monotonic() >= deadline:
+            engine.stop()
+            deadline = None
+    if args.output != '-':
+        stream.close()
+
+
+if __name__ == '__main__':
+    main()
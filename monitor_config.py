@@ -0,0 +1,19 @@
+import json
+import os
+
+DEFAULT_CONFIG_PATH = 'monitor_config.json'
+
+
+def load_monitor_config(path=DEFAULT_CONFIG_PATH):
+    """
+    读取监控配置（JSON对象），键与MonitorWorker的构造参数一致，例如：
+    {"capture_backend": "replay", "capture_options": {"source": "recordings/", "fps": 2}, "ocr_workers": 4}
+    文件不存在时返回空字典，全部使用默认值。
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        raise ValueError(f'{path} 应为JSON对象')
+    return config
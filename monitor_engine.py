@@ -0,0 +1,648 @@
+"""
+不依赖Qt的监控引擎：截图、模板匹配、OCR、阈值告警的完整流程，通过回调上报状态和数值。
+可直接在线程中运行（start/stop），也可在asyncio中await run_async()；界面中的MonitorWorker只是它的Qt适配层，
+命令行入口见monitor_cli.py。
+"""
+import asyncio
+import threading, queue, time, re, os, sys
+from datetime import datetime
+from task_manager import TaskManager
+from alert_dispatcher import AlertDispatcher
+from alert_rules import create_rule
+from screen_capture import create_grabber, FramePool
+from change_gate import FrameChangeDetector, OcrResultCache, region_key
+from ocr_engine import create_ocr_engine, MosaicOcrEngine
+from digit_recognizer import GlyphRecognizer, GlyphOcrEngine
+from ocr_pool import OcrProcessPool
+from poll_scheduler import AdaptivePoller, near_threshold
+from monitor_target import MonitorTarget
+from monitor_pipeline import LatestQueue, PipelineStage
+from log_writer import AsyncLogWriter
+from value_store import MonitorValueWriter
+from monitor_metrics import MonitorMetrics, MetricsServer
+from frame_ring import FrameRing, SnapshotWriter
+
+
+def resource_path(relative_path):
+    # 兼容PyInstaller打包和开发环境的资源路径
+    if hasattr(sys, '_MEIPASS'):
+        base_path = sys._MEIPASS
+    else:
+        base_path = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_path, relative_path)
+
+
+class MonitorEngine:
+    """
+    监控引擎。回调均可为空，且可能在引擎线程或告警分发线程中被调用，调用方需自行保证线程安全：
+    - on_status(text)：整体状态
+    - on_target_status(target_id, value_text, status)：单个目标的状态
+    - on_stats(dict)：缓存命中与耗时统计，{'frame_skip_ratio', 'ocr_hit_ratio', 'ocr_hits', 'ocr_misses',
+      'ocr_backend', 'ocr_latency', 'stages', 'metrics'}
+    - on_value(target_id, label, ts, value_text, num_value)：每次读数，无法转换为数值时num_value为None
+    - on_alert(target_id, label, value, reason)：告警提醒，reason为触发的告警规则说明，阈值告警时为None
+    targets为目标配置列表（字典，键见MonitorTarget.from_config），为None时从db_path的monitor_thresholds读取。
+    targets中的目标编号只在该配置内有效：匹配位置不写回db_path，识别值默认写入monitor_cli_values.db，
+    不会与界面保存的同编号目标混在一起。
+    """
+    def __init__(self, on_status=None, on_target_status=None, on_stats=None, on_value=None, on_alert=None,
+                 db_path='tasks.db', values_db_path=None, targets=None, tesseract_dir=None,
+                 alert_sound='y1478.wav', log_file='monitor_log.txt', track=True,
+                 ocr_cache_size=256, stats_interval=20, ocr_backend='auto',
+                 glyph_model='glyphs.npz', glyph_min_confidence=0.85,
+                 min_interval=0.5, glyph_min_interval=0.1, max_interval=3.0, near_ratio=0.1,
+                 pipelined=True, ocr_workers=0, ocr_max_pending=None, ocr_mosaic=True,
+                 alert_debounce=1.0, alert_hysteresis=0.02, realert_interval=30.0,
+                 capture_backend='auto', capture_options=None, metrics_port=None, metrics_host='127.0.0.1',
+                 snapshot_dir='snapshots', ring_max_mb=32, ring_crops=100, ring_frames=20, ring_frame_scale=0.25):
+        self.on_status = on_status
+        self.on_target_status = on_target_status
+        self.on_stats = on_stats
+        self.on_value = on_value
+        self.on_alert = on_alert
+        self.db_path = db_path
+        if values_db_path is None:
+            values_db_path = 'monitor_values.db' if targets is None else 'monitor_cli_values.db'
+        self.values_db_path = values_db_path
+        self.target_configs = targets
+        self.tesseract_dir = tesseract_dir or resource_path('Tesseract-OCR')
+        # 提醒音效，为None时不播放声音（如无声卡的服务器）
+        self.alert_sound = alert_sound
+        self.log_file = log_file
+        # 区域跟踪：只在上次匹配位置附近搜索
+        self.track = track
+        self.ocr_cache_size = ocr_cache_size
+        # OCR后端：auto / tesseract-api / pytesseract
+        self.ocr_backend = ocr_backend
+        # 字形识别模型（可选），文件存在时优先使用，置信度不足再交给tesseract
+        self.glyph_model = glyph_model
+        self.glyph_min_confidence = glyph_min_confidence
+        # 自适应轮询间隔（秒）：数值变化或接近阈值时用最短间隔，稳定或丢失目标时逐步退避到最长间隔
+        # 启用字形识别后读数足够快，最短间隔可以更短
+        self.min_interval = min_interval
+        self.glyph_min_interval = glyph_min_interval
+        self.max_interval = max_interval
+        # 距阈值多近（占区间宽度的比例）算作接近阈值
+        self.near_ratio = near_ratio
+        # 流水线模式：截图、匹配、OCR各自在独立线程中并发执行，日志和告警在本线程处理
+        self.pipelined = pipelined
+        # 多进程OCR的进程数，0表示在OCR线程内识别；目标很多时可设为CPU核数
+        self.ocr_workers = ocr_workers
+        self.ocr_max_pending = ocr_max_pending
+        # 拼图识别：同一轮的多个识别区域拼成一张图片只调用一次tesseract，失败时逐张识别（仅ocr_workers为0时）
+        self.ocr_mosaic = ocr_mosaic
+        # 告警：持续超限alert_debounce秒才提醒，回到区间内并离开边界alert_hysteresis比例才解除，
+        # 告警持续期间每realert_interval秒重复提醒一次
+        self.alert_debounce = alert_debounce
+        self.alert_hysteresis = alert_hysteresis
+        self.realert_interval = realert_interval
+        # 截图后端：auto / mss / pyautogui / replay，capture_options为后端参数（如回放的source、fps）
+        self.capture_backend = capture_backend
+        self.capture_options = capture_options or {}
+        # 各阶段耗时直方图和计数器；metrics_port不为空时在本机端口上提供Prometheus格式的/metrics
+        self.metrics = MonitorMetrics()
+        for name, help_text in (('monitor_frames_total', '截图帧数'),
+                                ('monitor_frames_unchanged_total', '与上一帧相同、复用匹配结果的帧数'),
+                                ('monitor_frames_dropped_total', '流水线中因下游处理不过来被丢弃的帧数'),
+                                ('monitor_target_misses_total', '未找到目标的次数'),
+                                ('monitor_ocr_cache_hits_total', 'OCR缓存命中次数'),
+                                ('monitor_ocr_cache_misses_total', 'OCR缓存未命中次数'),
+                                ('monitor_parse_failures_total', '识别结果无法转换为数值的次数'),
+                                ('monitor_alerts_total', '告警提醒次数'),
+                                ('monitor_snapshots_total', '告警或丢失目标时保存的画面快照数')):
+            self.metrics.counter(name, help_text)
+        self.metrics_port = metrics_port
+        self.metrics_host = metrics_host
+        # 画面回溯：内存中保留每个目标最近ring_crops个识别区域和最近ring_frames张按ring_frame_scale缩小的整帧，
+        # 总内存不超过ring_max_mb；告警或丢失目标时异步写到snapshot_dir，snapshot_dir为None时关闭
+        self.snapshot_dir = snapshot_dir
+        self.ring_max_mb = ring_max_mb
+        self.ring_crops = ring_crops
+        self.ring_frames = ring_frames
+        self.ring_frame_scale = ring_frame_scale
+        self.frame_ring = None
+        self.snapshots = None
+        # 每隔多少次循环上报一次缓存命中率
+        self.stats_interval = stats_interval
+        self.match_threshold = 0.7
+        self.running = False
+        self.alerts = None
+        self.targets = []
+        # 运行中的配置更新通道：界面线程入队，监控线程每轮开始时取出应用，无需轮询数据库
+        self._updates = queue.Queue()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _emit_status(self, text):
+        if self.on_status:
+            self.on_status(text)
+
+    def _emit_target_status(self, target_id, value_text, status):
+        if self.on_target_status:
+            self.on_target_status(target_id, value_text, status)
+
+    def _log(self, msg):
+        # 只入队，由后台线程批量写盘
+        self.log_writer.write(msg)
+
+    def _set_target_status(self, target, status):
+        # 状态变化时才发信号，避免刷屏
+        if status != target.status:
+            target.status = status
+            self._emit_target_status(target.id, target.last_value or '', status)
+            if self.alerts is not None:
+                self.alerts.invalidate(target.id)
+
+    def _on_alert(self, target_id, label, value, reason=None):
+        # 在告警分发线程中调用，reason为触发的告警规则说明，阈值告警时为None
+        message = f'{label} {reason}: {value}' if reason else f'{label} 数值超出阈值: {value}'
+        self._log(f'[{datetime.now().strftime("%Y-%m-%d %H:%M:%S")}] {message}')
+        self._emit_status(message)
+        self._dump_snapshot('alert', target_id, label, value=value, rule=reason)
+        if self.on_alert:
+            self.on_alert(target_id, label, value, reason)
+
+    def _dump_snapshot(self, reason, target_id, label, **meta):
+        if self.snapshots is not None and self.snapshots.dump(self.frame_ring, reason, target_id, label, **meta):
+            self.metrics.inc('monitor_snapshots_total')
+
+    def _load_target(self, target):
+        if not target.template_path or not os.path.exists(target.template_path):
+            self._set_target_status(target, '未找到模板图片')
+            return False
+        try:
+            target.load(threshold=self.match_threshold, track=self.track)
+        except Exception as e:
+            self._set_target_status(target, f'模板图片读取失败: {e}')
+            return False
+        self._configure_rules(target)
+        return True
+
+    def _configure_rules(self, target):
+        """
+        把目标的告警规则交给告警分发线程。使用targets配置时规则来自其中的rules键，否则读取monitor_rules表
+        """
+        configs = target.rules if self.target_configs is not None else self.db.get_monitor_rules(target.id)
+        try:
+            rules = [create_rule(**config) for config in configs]
+        except ValueError as e:
+            self._log(f'[{datetime.now().strftime("%Y-%m-%d %H:%M:%S")}] {target.label} 告警规则有误，已忽略: {e}')
+            rules = []
+        self.alerts.set_rules(target.id, rules)
+
+    def _load_targets(self, db):
+        """
+        读取配置中的目标（未配置时为monitor_thresholds中的全部目标）并加载模板
+        """
+        from_config = self.target_configs is not None
+        rows = self.target_configs if from_config else db.get_monitor_targets()
+        targets = []
+        for i, row in enumerate(rows):
+            # 单个目标的配置有误（如未知的OCR预处理预设）只跳过该目标
+            try:
+                target = MonitorTarget.from_config(row, i + 1) if from_config else MonitorTarget.from_row(row)
+            except (KeyError, ValueError) as e:
+                self._report_bad_config(row.get('id', i + 1) if from_config else row[0], e)
+                continue
+            if self._load_target(target):
+                targets.append(target)
+        return targets
+
+    def _report_bad_config(self, target_id, error):
+        self._log(f'[{datetime.now().strftime("%Y-%m-%d %H:%M:%S")}] 目标#{target_id} 配置有误: {error}')
+        self._emit_target_status(target_id, '', f'配置有误: {error}')
+
+    def update_target(self, row):
+        """
+        推送一个目标的新配置（TaskManager.get_monitor_targets()的一行），可在任意线程调用。
+        阈值、名称、识别区域原地更新，保留跟踪位置和缓存；模板变化时只重新加载该目标；新的目标ID会被加入监控。
+        """
+        self._updates.put(('update', row))
+
+    def remove_target(self, target_id):
+        self._updates.put(('remove', target_id))
+
+    def _apply_updates(self):
+        """
+        在监控线程中应用排队的配置更新，返回是否有更新。
+        流水线模式下匹配阶段在另一个线程遍历self.targets，因此总是构造新列表再整体替换。
+        """
+        changed = False
+        while True:
+            try:
+                kind, payload = self._updates.get_nowait()
+            except queue.Empty:
+                return changed
+            changed = True
+            targets = list(self.targets)
+            if kind == 'remove':
+                targets = [t for t in targets if t.id != payload]
+                self.alerts.set_rules(payload, None)
+                if self.frame_ring is not None:
+                    self.frame_ring.forget(payload)
+            else:
+                try:
+                    config = MonitorTarget.from_row(payload)
+                except ValueError as e:
+                    # 保留正在运行的旧配置
+                    self._report_bad_config(payload[0], e)
+                    continue
+                current = next((t for t in targets if t.id == config.id), None)
+                if current is not None and not current.apply_config(config):
+                    self._configure_rules(current)
+                    self._log(f'{datetime.now().strftime("%Y-%m-%d %H:%M:%S")} {current.label} 配置已更新')
+                    continue
+                # 新目标或模板变化：加载新模板后替换，沿用原目标的识别值和状态
+                if current is not None:
+                    targets.remove(current)
+                    if self.frame_ring is not None:
+                        self.frame_ring.forget(current.id)
+                    config.last_value, config.num_value, config.status = \
+                        current.last_value, current.num_value, current.status
+                if not self._load_target(config):
+                    self.targets = targets
+                    continue
+                targets.append(config)
+                self._log(f'{datetime.now().strftime("%Y-%m-%d %H:%M:%S")} {config.label} 模板已重新加载')
+            self.targets = targets
+
+    def _capture(self, grabber, out=None, reuse=True):
+        """
+        截图阶段：截取灰度帧并判断画面是否变化，返回(帧, 是否变化)。
+        流水线中帧由下游阶段持有，reuse=False使截图不写入截图后端的内部缓冲区
+        """
+        with self.metrics.timer('capture'):
+            frame = grabber.grab(out=out, reuse=reuse)
+            frame_changed = self.change_detector.changed(frame)
+            # 只记录有变化的帧，同样的内存可以回溯更长时间
+            if frame_changed and self.frame_ring is not None:
+                self.frame_ring.push_frame(time.time(), frame)
+        self.metrics.inc('monitor_frames_total')
+        if not frame_changed:
+            self.metrics.inc('monitor_frames_unchanged_total')
+        return frame, frame_changed
+
+    def _match_targets(self, img_gray, frame_changed, copy_crops=False):
+        with self.metrics.timer('match'):
+            return self._match_targets_timed(img_gray, frame_changed, copy_crops)
+
+    def _match_targets_timed(self, img_gray, frame_changed, copy_crops):
+        """
+        匹配阶段：在同一帧上定位所有目标并切出识别区域。
+        返回[(目标, 左上角坐标或None, 识别区域或None), ...]；流水线模式下识别区域会复制一份，帧缓冲区可以立即归还。
+        """
+        results = []
+        for target in self.targets:
+            # 画面没有变化时直接复用上一次的匹配结果
+            if frame_changed or target.last_match is None:
+                target.last_match = target.matcher.match(img_gray)
+            max_val, max_loc = target.last_match
+            if max_val < self.match_threshold:
+                results.append((target, None, None))
+                continue
+            # 直接在匹配所用的同一帧上切出识别区域，不再二次截图
+            crop = target.ocr_region(img_gray, max_loc)
+            if crop is not None and copy_crops:
+                crop = crop.copy()
+            results.append((target, max_loc, crop))
+        return results
+
+    def _read_targets(self, matches):
+        """
+        OCR阶段：返回[(目标, 左上角坐标或None, 识别值或None), ...]
+        """
+        values = [None] * len(matches)
+        pending = []
+        for i, (target, top_left, crop) in enumerate(matches):
+            if crop is not None:
+                # 以识别区域像素哈希作为OCR缓存键，内容未变时不再调用tesseract；预设不同时结果可能不同，一并计入键中
+                key = region_key(crop)
+                if target.preprocessor is not None:
+                    key = f'{key}|{target.ocr_preset}'
+                values[i] = self.ocr_cache.get(key)
+                if values[i] is None:
+                    pending.append((i, key, target, crop))
+        hits = sum(crop is not None for _, _, crop in matches) - len(pending)
+        self.metrics.inc('monitor_ocr_cache_hits_total', hits)
+        self.metrics.inc('monitor_ocr_cache_misses_total', len(pending))
+        if pending:
+            # 只对未命中缓存的区域做预处理，画面回溯中保留的仍是原始区域
+            with self.metrics.timer('preprocess'):
+                images = [crop if target.preprocessor is None else target.preprocessor(crop)
+                          for _, _, target, crop in pending]
+            # 未命中缓存的区域一次性交给OCR引擎，进程池模式下并行识别，结果按下标回到各自的目标
+            with self.metrics.timer('ocr'):
+                texts = self.ocr.recognize_many(images)
+            with self.metrics.timer('parse'):
+                for (i, key, _, _), text in zip(pending, texts):
+                    match = re.search(r'\d+\.?\d*', text)
+                    values[i] = match.group(0) if match else text.strip()
+                    self.ocr_cache.put(key, values[i])
+        if self.frame_ring is not None:
+            now = time.time()
+            for (target, _, crop), value in zip(matches, values):
+                self.frame_ring.push_crop(target.id, now, crop, value)
+        return [(target, top_left, value) for (target, top_left, _), value in zip(matches, values)]
+
+    def _handle_reads(self, reads, ts):
+        with self.metrics.timer('log'):
+            return self._handle_reads_timed(reads, ts)
+
+    def _handle_reads_timed(self, reads, ts):
+        """
+        处理阶段：记录日志和数值、保存位置、阈值判断。ts为该帧的截图时间戳。返回是否需要加快轮询。
+        """
+        now = datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')
+        urgent = False
+        for target, top_left, value in reads:
+            if top_left is None:
+                self._log(f'[{now}] {target.label} 目标区域未找到！')
+                if target.status != '未找到':
+                    self._dump_snapshot('miss', target.id, target.label)
+                self.metrics.inc('monitor_target_misses_total')
+                self._set_target_status(target, '未找到')
+                continue
+            # 位置变化时写回数据库，下次启动可跳过首次整屏搜索；targets配置的目标不在数据库中，只记在内存里
+            if top_left != target.saved_loc:
+                if self.target_configs is None:
+                    self.db.update_monitor_location(target.id, int(top_left[0]), int(top_left[1]))
+                target.saved_loc = top_left
+            if value is None:
+                self._set_target_status(target, '识别区域超出屏幕')
+                continue
+            target.changed = value != target.last_value
+            if target.changed:
+                self._log(f'{now} {target.label} 识别数值: {value}')
+                target.last_value = value
+            # 阈值判断
+            try:
+                num_value = float(value)
+            except ValueError:
+                target.num_value = None
+                self.metrics.inc('monitor_parse_failures_total')
+                self.value_writer.add(target.id, target.name, ts, None, value)
+                if self.on_value:
+                    self.on_value(target.id, target.label, ts, value, None)
+                self._set_target_status(target, '无法识别')
+                urgent |= target.changed
+                continue
+            target.num_value = num_value
+            self.value_writer.add(target.id, target.name, ts, num_value, value)
+            if self.on_value:
+                self.on_value(target.id, target.label, ts, value, num_value)
+            target.alerting = target.out_of_range(num_value)
+            # 去抖、回差、提醒声音和状态信号都交给告警分发线程，这里只入队，不阻塞监控循环
+            target.status = None
+            self.alerts.submit(target.id, target.label, num_value, value,
+                               target.min_threshold, target.max_threshold, ts)
+            urgent |= target.changed or target.alerting or near_threshold(
+                num_value, target.min_threshold, target.max_threshold, self.near_ratio)
+        return urgent
+
+    def _emit_stats(self, stages=None):
+        if not self.on_stats:
+            return
+        self.on_stats({
+            'frame_skip_ratio': self.change_detector.skip_ratio,
+            'ocr_hit_ratio': self.ocr_cache.hit_ratio,
+            'ocr_hits': self.ocr_cache.hits,
+            'ocr_misses': self.ocr_cache.misses,
+            'ocr_backend': self.ocr.name,
+            'ocr_latency': self.ocr.latency.snapshot(),
+            'stages': {stage.stage_name: stage.stats() for stage in stages or []},
+            'metrics': self.metrics.snapshot(),
+        })
+
+    def _run_serial(self, grabber, poller):
+        ticks = 0
+        while self.running and not grabber.exhausted:
+            if self._apply_updates():
+                poller.reset()
+            ticks += 1
+            if ticks % self.stats_interval == 0:
+                self._emit_stats()
+            # 截图直接在内存中转为灰度帧，缓冲区复用
+            img_gray, frame_changed = self._capture(grabber)
+            ts = time.time()
+            reads = self._read_targets(self._match_targets(img_gray, frame_changed))
+            urgent = self._handle_reads(reads, ts)
+            # 用Event等待代替sleep，停止监控时可以立即退出长间隔
+            self._stop_event.wait(poller.next_interval(urgent))
+
+    def _run_pipelined(self, grabber, poller):
+        """
+        截图 -> 匹配 -> OCR 三个阶段各占一个线程，阶段之间用容量为1的drop-stale队列连接，
+        下游处理不过来时丢弃旧帧，OCR总是处理最新的画面。日志、告警在本线程中处理。
+        """
+        pool = FramePool(size=3)
+        def drop_frame(packet):
+            self.metrics.inc('monitor_frames_dropped_total')
+            pool.release(packet[0])
+
+        match_queue = LatestQueue(1, on_drop=drop_frame)
+        ocr_queue = LatestQueue(1, on_drop=lambda packet: self.metrics.inc('monitor_frames_dropped_total'))
+        result_queue = LatestQueue(16)
+        urgent = [False]
+        # 截图阶段累计的画面变化次数随帧一起传递。匹配阶段与自己上次匹配时的计数比较，
+        # 中间被丢弃的帧里发生过的变化不会漏掉（只比较相邻两帧时，丢弃的帧若恰好是变化帧，后续相同的帧会被误判为未变化）
+        changes = [0]
+        matched_changes = [None]
+
+        def capture():
+            if grabber.exhausted:
+                return None
+            ok, buf = pool.acquire(timeout=0.5)
+            if not ok:
+                return None
+            try:
+                frame, frame_changed = self._capture(grabber, out=buf, reuse=False)
+            except Exception:
+                pool.release(buf)
+                raise
+            changes[0] += frame_changed
+            return frame, changes[0], time.time()
+
+        def match(packet):
+            frame, change_count, ts = packet
+            frame_changed = change_count != matched_changes[0]
+            matched_changes[0] = change_count
+            try:
+                return self._match_targets(frame, frame_changed, copy_crops=True), ts
+            finally:
+                pool.release(frame)
+
+        def read(packet):
+            matches, ts = packet
+            return self._read_targets(matches), ts
+
+        def pace():
+            self._stop_event.wait(poller.next_interval(urgent[0]))
+
+        def on_error(stage_name, e):
+            self._emit_status(f'{stage_name}阶段出错: {e}')
+
+        stages = [
+            PipelineStage('capture', capture, out_queue=match_queue, pace=pace, on_error=on_error),
+            PipelineStage('match', match, match_queue, ocr_queue, on_error=on_error),
+            PipelineStage('ocr', read, ocr_queue, result_queue, on_error=on_error),
+        ]
+        for stage in stages:
+            stage.start()
+        ticks = 0
+        try:
+            while self.running:
+                if self._apply_updates():
+                    poller.reset()
+                packet = result_queue.get(timeout=0.2)
+                if packet is None:
+                    # 回放结束后，等各阶段队列中剩余的帧处理完再退出
+                    if grabber.exhausted and not match_queue.qsize() and not ocr_queue.qsize():
+                        break
+                    continue
+                ticks += 1
+                if ticks % self.stats_interval == 0:
+                    self._emit_stats(stages)
+                reads, ts = packet
+                urgent[0] = self._handle_reads(reads, ts)
+        finally:
+            # 本线程出错退出时也要停下各阶段线程，否则它们会继续截图
+            for stage in stages:
+                stage.stop()
+            for stage in stages:
+                stage.join()
+
+    def run(self):
+        """
+        在当前线程中运行监控，直到stop()或回放结束才返回
+        """
+        self.db = TaskManager(self.db_path, self.values_db_path)
+        self.log_writer = AsyncLogWriter(self.log_file).start()
+        # 识别到的数值批量写入monitor_values.db，供历史查询和导出
+        self.value_writer = MonitorValueWriter(self.db.values_db_path).start()
+        self.alerts = AlertDispatcher(on_status=self._emit_target_status, on_alert=self._on_alert,
+                                      sound=self.alert_sound, debounce=self.alert_debounce,
+                                      hysteresis=self.alert_hysteresis, realert_interval=self.realert_interval,
+                                      metrics=self.metrics).start()
+        if self.snapshot_dir:
+            self.frame_ring = FrameRing(int(self.ring_max_mb * 1024 * 1024), self.ring_crops, self.ring_frames,
+                                        self.ring_frame_scale)
+            self.snapshots = SnapshotWriter(self.snapshot_dir).start()
+        metrics_server = None
+        if self.metrics_port is not None:
+            try:
+                metrics_server = MetricsServer(self.metrics, self.metrics_port, self.metrics_host).start()
+                self._log(f'[{datetime.now().strftime("%Y-%m-%d %H:%M:%S")}] 监控指标：'
+                          f'http://{self.metrics_host}:{metrics_server.port}/metrics')
+            except OSError as e:
+                self._emit_status(f'监控指标端口{self.metrics_port}启动失败: {e}')
+        try:
+            self._monitor(self.tesseract_dir)
+        finally:
+            self.running = False
+            if metrics_server is not None:
+                metrics_server.close()
+            self.alerts.close()
+            if self.snapshots is not None:
+                self.snapshots.close()
+            self.value_writer.close()
+            self.log_writer.close()
+            self.db.conn.close()
+
+    def start(self):
+        """
+        在后台线程中运行监控
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self.run, name='monitor-engine', daemon=True)
+            self._thread.start()
+        return self
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    async def run_async(self):
+        """
+        在asyncio中运行：监控在线程池中执行，回调被转到当前事件循环线程中调用；任务被取消时停止监控
+        """
+        loop = asyncio.get_running_loop()
+
+        def threadsafe(callback):
+            if callback is None:
+                return None
+            return lambda *args: loop.call_soon_threadsafe(callback, *args)
+
+        (self.on_status, self.on_target_status, self.on_stats, self.on_value, self.on_alert) = (
+            threadsafe(self.on_status), threadsafe(self.on_target_status), threadsafe(self.on_stats),
+            threadsafe(self.on_value), threadsafe(self.on_alert))
+        self._stop_event.clear()
+        future = loop.run_in_executor(None, self.run)
+        try:
+            await asyncio.shield(future)
+        except asyncio.CancelledError:
+            self.stop()
+            await future
+            raise
+
+    def _monitor(self, tesseract_dir):
+        self.targets = self._load_targets(self.db)
+        if not self.targets:
+            self._emit_status('没有可用的监控目标')
+            return
+        use_glyph = bool(self.glyph_model) and os.path.exists(self.glyph_model)
+        min_interval = self.glyph_min_interval if use_glyph else self.min_interval
+        # 常驻的OCR引擎，整个监控过程只初始化一次
+        try:
+            if self.ocr_workers > 0:
+                self.ocr = OcrProcessPool(self.ocr_workers, self.ocr_max_pending, self.ocr_backend, tesseract_dir,
+                                          self.glyph_model if use_glyph else None, self.glyph_min_confidence)
+            else:
+                self.ocr = create_ocr_engine(self.ocr_backend, tesseract_dir)
+                if self.ocr_mosaic:
+                    self.ocr = MosaicOcrEngine(self.ocr)
+        except Exception as e:
+            self._emit_status(f'OCR引擎初始化失败: {e}')
+            return
+        if use_glyph and self.ocr_workers <= 0:
+            try:
+                recognizer = GlyphRecognizer.load(self.glyph_model)
+                self.ocr = GlyphOcrEngine(recognizer, self.ocr, self.glyph_min_confidence)
+            except Exception as e:
+                min_interval = self.min_interval
+                self._log(f'字形模型加载失败，使用tesseract: {e}')
+        # 所有目标共用一次截图，截图开销不随目标数量增加
+        try:
+            grabber = create_grabber(self.capture_backend, **self.capture_options)
+        except Exception as e:
+            self.ocr.close()
+            self._emit_status(f'截图后端初始化失败: {e}')
+            return
+        self.change_detector = FrameChangeDetector()
+        self.ocr_cache = OcrResultCache(self.ocr_cache_size)
+        poller = AdaptivePoller(min_interval, self.max_interval)
+        if self._stop_event.is_set():
+            # 启动过程中已被要求停止
+            grabber.close()
+            self.ocr.close()
+            return
+        self.running = True
+        self._emit_status(f'监控中（{len(self.targets)}个目标，截图{grabber.name}）')
+        try:
+            if self.pipelined:
+                self._run_pipelined(grabber, poller)
+            else:
+                self._run_serial(grabber, poller)
+        finally:
+            grabber.close()
+            self.ocr.close()
+        if grabber.exhausted:
+            self._emit_status('回放结束')
+        self._emit_status('已停止')
+
+    def stop(self):
+        self.running = False
+        self._stop_event.set()
@@ -0,0 +1,192 @@
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 阶段耗时直方图的默认分桶（秒）
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    """
+    固定分桶的直方图，counts[i]为落在(buckets[i-1], buckets[i]]中的次数，最后一个桶为+Inf
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        # 分桶很少，线性查找比bisect更快
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q):
+        """
+        按分桶线性插值估算分位数，落在+Inf桶时返回最大的有限边界
+        """
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if total == 0:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for i, c in enumerate(counts):
+            if c and seen + c >= rank:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / c
+            seen += c
+        return self.buckets[-1]
+
+
+class _Timer:
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class MonitorMetrics:
+    """
+    监控的计数器和各阶段耗时直方图。可在任意线程中更新；
+    snapshot()给界面显示，render_prometheus()输出Prometheus文本格式。
+    """
+    STAGE_METRIC = 'monitor_stage_seconds'
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.stages = {}
+        self.counters = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name):
+        histogram = self.stages.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.stages.setdefault(name, Histogram(self.buckets))
+        return histogram
+
+    def timer(self, name):
+        """
+        with metrics.timer('match'): ... 记录代码块耗时
+        """
+        return _Timer(self.stage(name))
+
+    def observe(self, name, seconds):
+        self.stage(name).observe(seconds)
+
+    def counter(self, name, help_text=''):
+        counter = self.counters.get(name)
+        if counter is None:
+            with self._lock:
+                counter = self.counters.setdefault(name, Counter())
+                if help_text:
+                    self._help[name] = help_text
+        return counter
+
+    def inc(self, name, amount=1):
+        self.counter(name).inc(amount)
+
+    def snapshot(self):
+        stages = {}
+        for name, h in list(self.stages.items()):
+            stages[name] = {
+                'count': h.count,
+                'avg_ms': h.sum / h.count * 1000 if h.count else 0.0,
+                'p50_ms': h.quantile(0.5) * 1000,
+                'p95_ms': h.quantile(0.95) * 1000,
+                'p99_ms': h.quantile(0.99) * 1000,
+            }
+        counters = {name: c.value for name, c in list(self.counters.items())}
+        return {'stages': stages, 'counters': counters}
+
+    def render_prometheus(self):
+        lines = [f'# HELP {self.STAGE_METRIC} 监控各阶段耗时（秒）', f'# TYPE {self.STAGE_METRIC} histogram']
+        for name, h in sorted(self.stages.items()):
+            with h._lock:
+                counts, total, h_sum = list(h.counts), h.count, h.sum
+            cumulative = 0
+            for bound, c in zip(h.buckets + (math.inf,), counts):
+                cumulative += c
+                le = '+Inf' if bound == math.inf else repr(bound)
+                lines.append(f'{self.STAGE_METRIC}_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'{self.STAGE_METRIC}_sum{{stage="{name}"}} {h_sum}')
+            lines.append(f'{self.STAGE_METRIC}_count{{stage="{name}"}} {total}')
+        for name, c in sorted(self.counters.items()):
+            if name in self._help:
+                lines.append(f'# HELP {name} {self._help[name]}')
+            lines.append(f'# TYPE {name} counter')
+            lines.append(f'{name} {c.value}')
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    """
+    在本机端口上以Prometheus文本格式提供/metrics，后台线程运行。默认只监听127.0.0.1。
+    """
+    def __init__(self, metrics, port, host='127.0.0.1'):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # 不把每次抓取打印到控制台
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        # port=0时由系统分配端口
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='metrics-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import deque
+
+from ocr_engine import LatencyStats
+
+
+class LatestQueue:
+    """
+    有界队列，队列满时丢弃最旧的元素（drop-stale），保证下游总是处理最新的数据。
+    on_drop在元素被丢弃时调用，可用于归还帧缓冲区。
+    """
+    def __init__(self, maxsize=1, on_drop=None):
+        self.maxsize = maxsize
+        self.on_drop = on_drop
+        self.dropped = 0
+        self._items = deque()
+        self._cond = threading.Condition()
+
+    def put(self, item):
+        dropped = []
+        with self._cond:
+            while len(self._items) >= self.maxsize:
+                dropped.append(self._items.popleft())
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+        if self.on_drop:
+            for old in dropped:
+                self.on_drop(old)
+
+    def get(self, timeout=None):
+        """
+        取出最早的元素，超时返回None
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items, timeout):
+                return None
+            return self._items.popleft()
+
+    def drain(self):
+        with self._cond:
+            items = list(self._items)
+            self._items.clear()
+        return items
+
+    def qsize(self):
+        return len(self._items)
+
+
+class PipelineStage(threading.Thread):
+    """
+    流水线中的一个阶段，在独立线程中从in_queue取数据，处理后放入out_queue。
+    in_queue为None时是数据源阶段：循环调用func()产生数据，每次之后调用pace()控制节奏（不计入耗时）。
+    func返回None表示本次没有输出。
+    """
+    def __init__(self, name, func, in_queue=None, out_queue=None, pace=None, on_error=None):
+        super().__init__(name=name, daemon=True)
+        self.stage_name = name
+        self.func = func
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.pace = pace
+        self.on_error = on_error
+        self.latency = LatencyStats()
+        self.processed = 0
+        self.errors = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            if self.in_queue is None:
+                args = ()
+            else:
+                item = self.in_queue.get(timeout=0.1)
+                if item is None:
+                    continue
+                args = (item,)
+            start = time.perf_counter()
+            try:
+                result = self.func(*args)
+            except Exception as e:
+                self.errors += 1
+                if self.on_error:
+                    self.on_error(self.stage_name, e)
+                result = None
+            self.latency.add(time.perf_counter() - start)
+            self.processed += 1
+            if result is not None and self.out_queue is not None:
+                self.out_queue.put(result)
+            if self.pace:
+                self.pace()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def stats(self):
+        return {
+            'depth': self.in_queue.qsize() if self.in_queue is not None else 0,
+            'dropped': self.in_queue.dropped if self.in_queue is not None else 0,
+            'processed': self.processed,
+            'errors': self.errors,
+            'avg_ms': self.latency.avg * 1000,
+            'p95_ms': self.latency.percentile(95) * 1000,
+        }
@@ -0,0 +1,108 @@
+"""
+在独立子进程中运行MonitorEngine。截图、灰度转换、匹配和OCR都在子进程里完成，不与界面争抢GIL；
+子进程只把状态、统计等小消息通过multiprocessing队列发回，界面侧定期poll()取出。
+子进程崩溃（如OCR库段错误）只会让监控停止，不会影响主程序。本模块不依赖Qt。
+"""
+import multiprocessing
+import queue
+import threading
+
+
+def _engine_main(options, events, commands):
+    """
+    子进程入口：创建引擎，回调转成事件放入events；另开线程接收commands中的配置更新和停止命令
+    """
+    from monitor_engine import MonitorEngine
+    engine = MonitorEngine(
+        on_status=lambda text: events.put(('status', text)),
+        on_target_status=lambda target_id, value, status: events.put(('target_status', target_id, value, status)),
+        on_stats=lambda stats: events.put(('stats', stats)),
+        **options)
+
+    def listen():
+        while True:
+            command = commands.get()
+            if command[0] == 'stop':
+                engine.stop()
+                return
+            if command[0] == 'update':
+                engine.update_target(command[1])
+            elif command[0] == 'remove':
+                engine.remove_target(command[1])
+
+    threading.Thread(target=listen, name='monitor-commands', daemon=True).start()
+    try:
+        engine.run()
+    except Exception as e:
+        events.put(('status', f'监控进程出错: {e}'))
+
+
+class MonitorProcess:
+    """
+    父进程一侧的句柄。options为MonitorEngine的构造参数（需可pickle），回调不能跨进程传递，改用poll()取事件：
+    ('status', text) / ('target_status', target_id, value_text, status) / ('stats', dict)
+    子进程退出后poll()会追加一个('exit', exitcode)事件，exitcode非0表示异常退出。
+    """
+    def __init__(self, **options):
+        self.options = options
+        # spawn启动：不复制父进程中的Qt线程和窗口状态，Windows与Linux行为一致
+        self._ctx = multiprocessing.get_context('spawn')
+        self._events = self._ctx.Queue()
+        self._commands = self._ctx.Queue()
+        self._process = None
+        self._exit_reported = False
+
+    def start(self):
+        self._process = self._ctx.Process(target=_engine_main, name='monitor-engine',
+                                          args=(self.options, self._events, self._commands), daemon=True)
+        self._process.start()
+        return self
+
+    def is_alive(self):
+        return self._process is not None and self._process.is_alive()
+
+    @property
+    def exitcode(self):
+        return self._process.exitcode if self._process is not None else None
+
+    def update_target(self, row):
+        self._commands.put(('update', tuple(row)))
+
+    def remove_target(self, target_id):
+        self._commands.put(('remove', target_id))
+
+    def stop(self):
+        if self.is_alive():
+            self._commands.put(('stop',))
+
+    def join(self, timeout=None):
+        """
+        等待子进程退出，超时仍未退出时强制结束。返回子进程是否已退出
+        """
+        if self._process is None:
+            return True
+        self._process.join(timeout)
+        if self._process.is_alive() and timeout is not None:
+            self._process.terminate()
+            self._process.join(1)
+        return not self._process.is_alive()
+
+    def poll(self, max_events=100):
+        """
+        非阻塞地取出最多max_events个事件
+        """
+        events = []
+        while len(events) < max_events:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                break
+        if not events and not self._exit_reported and self._process is not None and not self.is_alive():
+            # 事件全部取完后再报告退出，保证'已停止'等最后的状态先送达；队列的后台线程可能还有未送达的消息
+            try:
+                return [self._events.get(timeout=0.1)]
+            except queue.Empty:
+                pass
+            self._exit_reported = True
+            events.append(('exit', self._process.exitcode))
+        return events
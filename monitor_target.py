@@ -0,0 +1,108 @@
+import os
+
+from ocr_preprocess import get_preprocessor
+from template_cache import template_cache
+from template_matcher import TemplateMatcher, DEFAULT_PYRAMID_LEVELS
+
+
+class MonitorTarget:
+    """
+    单个监控目标：模板图片、阈值区间，以及运行时的匹配位置、识别值和告警状态
+    """
+    def __init__(self, target_id, name, template_path, min_threshold=None, max_threshold=None,
+                 last_loc=None, pyramid_levels=None, ocr_box=None, ocr_preset=None, rules=None):
+        self.id = target_id
+        self.name = name
+        self.template_path = template_path
+        self.min_threshold = min_threshold
+        self.max_threshold = max_threshold
+        self.pyramid_levels = DEFAULT_PYRAMID_LEVELS if pyramid_levels is None else pyramid_levels
+        # 识别区域：(dx, dy, w, h)，相对模板左上角偏移，w/h为None时使用模板尺寸
+        dx, dy, ocr_w, ocr_h = ocr_box or (None, None, None, None)
+        self.ocr_dx, self.ocr_dy = dx or 0, dy or 0
+        self.ocr_w, self.ocr_h = ocr_w, ocr_h
+        # OCR预处理预设，未知的名称在这里就抛出ValueError
+        self.ocr_preset = ocr_preset or 'none'
+        self.preprocessor = get_preprocessor(ocr_preset)
+        # 告警规则配置（[{'kind': ..., 参数...}, ...]，见alert_rules.py），数据库中的目标由引擎从monitor_rules读取
+        self.rules = list(rules or [])
+        self.template = None
+        self.matcher = None
+        self.w = self.h = 0
+        # 运行时状态
+        self.last_match = None
+        self.saved_loc = tuple(last_loc) if last_loc is not None else None
+        self.last_value = None
+        self.num_value = None
+        self.changed = False
+        self.status = None
+        self.alerting = False
+
+    @classmethod
+    def from_row(cls, row):
+        # row: TaskManager.get_monitor_targets()的一行
+        (target_id, name, template_path, min_threshold, max_threshold, last_x, last_y, pyramid_levels,
+         ocr_dx, ocr_dy, ocr_w, ocr_h, ocr_preset) = row
+        last_loc = (last_x, last_y) if last_x is not None and last_y is not None else None
+        return cls(target_id, name, template_path, min_threshold, max_threshold, last_loc, pyramid_levels,
+                   (ocr_dx, ocr_dy, ocr_w, ocr_h), ocr_preset)
+
+    @classmethod
+    def from_config(cls, config, default_id=None):
+        """
+        从配置字典创建目标（命令行等不使用数据库的场景），例如：
+        {"id": 1, "name": "温度", "template": "t.png", "min": 0, "max": 80, "ocr_box": [120, 0, 60, 30], "pyramid_levels": 2,
+         "ocr_preset": "small_text", "rules": [{"kind": "stuck", "seconds": 120}]}
+        """
+        return cls(config.get('id', default_id), config.get('name') or os.path.basename(config['template']),
+                   config['template'], config.get('min'), config.get('max'),
+                   pyramid_levels=config.get('pyramid_levels'), ocr_box=config.get('ocr_box'),
+                   ocr_preset=config.get('ocr_preset'), rules=config.get('rules'))
+
+    def apply_config(self, other):
+        """
+        把other（同一目标的新配置）中的名称、阈值、识别区域和预处理预设更新到本目标，保留匹配位置、识别值等运行时状态。
+        返回模板图片或金字塔层数是否变化，变化时需要重新load()。
+        """
+        self.name = other.name
+        self.min_threshold = other.min_threshold
+        self.max_threshold = other.max_threshold
+        self.ocr_dx, self.ocr_dy = other.ocr_dx, other.ocr_dy
+        self.ocr_w, self.ocr_h = other.ocr_w, other.ocr_h
+        self.ocr_preset, self.preprocessor = other.ocr_preset, other.preprocessor
+        return other.template_path != self.template_path or other.pyramid_levels != self.pyramid_levels
+
+    @property
+    def label(self):
+        return f'{self.name}#{self.id}' if self.id is not None else self.name
+
+    def load(self, threshold=0.7, track=True):
+        # 灰度图和金字塔来自进程级模板缓存，文件未修改时重新开始监控不必再次读取和计算
+        data = template_cache.get(self.template_path, self.pyramid_levels)
+        if data.flat:
+            raise ValueError('模板图片为纯色，无法匹配')
+        self.template = data.gray
+        self.h, self.w = self.template.shape[:2]
+        self.matcher = TemplateMatcher(self.template, threshold=threshold, track=track,
+                                       last_loc=self.saved_loc, pyramid_levels=self.pyramid_levels,
+                                       template_pyramid=data.pyramid)
+
+    def ocr_region(self, frame, top_left):
+        """
+        返回匹配帧中识别区域的切片（视图，不复制数据），越界部分会被裁掉；区域为空时返回None
+        """
+        fh, fw = frame.shape[:2]
+        x0 = max(0, top_left[0] + self.ocr_dx)
+        y0 = max(0, top_left[1] + self.ocr_dy)
+        x1 = min(fw, top_left[0] + self.ocr_dx + (self.ocr_w or self.w))
+        y1 = min(fh, top_left[1] + self.ocr_dy + (self.ocr_h or self.h))
+        if x1 <= x0 or y1 <= y0:
+            return None
+        return frame[y0:y1, x0:x1]
+
+    def out_of_range(self, num_value):
+        if self.min_threshold is not None and num_value < self.min_threshold:
+            return True
+        if self.max_threshold is not None and num_value > self.max_threshold:
+            return True
+        return False
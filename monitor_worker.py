@@ -1,96 +1,85 @@
-from PyQt5.QtCore import QThread, pyqtSignal
-import pyautogui, pytesseract, cv2, numpy as np, time, re, os, sys
-from datetime import datetime
-from PIL import Image
-from task_manager import TaskManager
-from notifier import play_sound
+from PyQt5.QtCore import QObject, QThread, QTimer, pyqtSignal
+from monitor_engine import MonitorEngine
+from monitor_process import MonitorProcess
+
 
 class MonitorWorker(QThread):
+    """
+    MonitorEngine的Qt适配层：在QThread中运行引擎，把回调转换为信号。参数与MonitorEngine相同。
+    """
     status_signal = pyqtSignal(str)
+    # 单个目标的状态：(目标ID, 当前值, 状态)
+    target_status_signal = pyqtSignal(int, str, str)
+    # 缓存命中与耗时统计：{'frame_skip_ratio', 'ocr_hit_ratio', 'ocr_hits', 'ocr_misses', 'ocr_backend', 'ocr_latency', 'stages', 'metrics'}
+    stats_signal = pyqtSignal(dict)
 
-    def __init__(self, template_path='template.png', log_file='monitor_log.txt', parent=None):
+    def __init__(self, parent=None, **options):
         super().__init__(parent)
-        self.template_path = template_path
-        self.log_file = log_file
-        self.running = False
+        self.engine = MonitorEngine(on_status=self.status_signal.emit,
+                                    on_target_status=self.target_status_signal.emit,
+                                    on_stats=self.stats_signal.emit, **options)
 
     def run(self):
-        # 兼容PyInstaller打包和开发环境的tesseract路径
-        def resource_path(relative_path):
-            if hasattr(sys, '_MEIPASS'):
-                base_path = sys._MEIPASS
-            else:
-                base_path = os.path.dirname(os.path.abspath(__file__))
-            return os.path.join(base_path, relative_path)
-        tesseract_path = resource_path(os.path.join('Tesseract-OCR', 'tesseract.exe'))
-        pytesseract.pytesseract.tesseract_cmd = tesseract_path
-        if not os.path.exists(self.template_path):
-            self.status_signal.emit('未找到template.png')
-            return
-        # 读取数据库阈值
-        db = TaskManager()
-        c = db.conn.cursor()
-        c.execute('SELECT min_threshold, max_threshold FROM monitor_thresholds WHERE template_path=? ORDER BY id DESC LIMIT 1', (self.template_path,))
-        row = c.fetchone()
-        min_threshold, max_threshold = None, None
-        if row:
-            min_threshold, max_threshold = row
-        # 用PIL读取模板图片，兼容中文路径和多格式
-        try:
-            pil_template = Image.open(self.template_path)
-            template = cv2.cvtColor(np.array(pil_template), cv2.COLOR_RGB2GRAY)
-        except Exception as e:
-            self.status_signal.emit(f'模板图片读取失败: {e}')
-            return
-        w, h = template.shape[::-1]
-        last_value = None
-        self.running = True
-        self.status_signal.emit('监控中')
-        while self.running:
-            screenshot = pyautogui.screenshot()
-            screenshot.save('screen.png')
-            img_rgb = cv2.imread('screen.png')
-            img_gray = cv2.cvtColor(img_rgb, cv2.COLOR_BGR2GRAY)
-            res = cv2.matchTemplate(img_gray, template, cv2.TM_CCOEFF_NORMED)
-            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(res)
-            threshold = 0.7
-            now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            if max_val < threshold:
-                msg = f'[{now}] 目标区域未找到！'
-                with open(self.log_file, 'a', encoding='utf-8') as f:
-                    f.write(msg + '\n')
-                time.sleep(1)
-                if os.path.exists('screen.png'):
-                    os.remove('screen.png')
-                continue
-            top_left = max_loc
-            region = (top_left[0], top_left[1], w, h)
-            target_img = pyautogui.screenshot(region=region)
-            text = pytesseract.image_to_string(target_img, config='--psm 7')
-            match = re.search(r'\d+\.?\d*', text)
-            value = match.group(0) if match else text.strip()
-            if value != last_value:
-                msg = f'{now} 识别数值: {value}'
-                with open(self.log_file, 'a', encoding='utf-8') as f:
-                    f.write(msg + '\n')
-                last_value = value
-            # 阈值判断
-            try:
-                num_value = float(value)
-                alert = False
-                if min_threshold is not None and num_value < min_threshold:
-                    alert = True
-                if max_threshold is not None and num_value > max_threshold:
-                    alert = True
-                if alert:
-                    play_sound('y1478.wav')
-                    self.status_signal.emit(f'数值超出阈值: {num_value}')
-            except Exception:
-                pass
-            time.sleep(0.5)
-            if os.path.exists('screen.png'):
-                os.remove('screen.png')
-        self.status_signal.emit('已停止')
+        self.engine.run()
+
+    def update_target(self, row):
+        self.engine.update_target(row)
+
+    def remove_target(self, target_id):
+        self.engine.remove_target(target_id)
+
+    def stop(self):
+        self.engine.stop()
+
+
+class MonitorProcessWorker(QObject):
+    """
+    与MonitorWorker接口相同，但引擎运行在独立子进程中（见monitor_process.py）。
+    界面线程用定时器取回子进程的事件并转换为信号，子进程异常退出时发出状态提示。
+    """
+    status_signal = pyqtSignal(str)
+    target_status_signal = pyqtSignal(int, str, str)
+    stats_signal = pyqtSignal(dict)
+    finished = pyqtSignal()
+
+    def __init__(self, parent=None, poll_interval=50, **options):
+        super().__init__(parent)
+        self.process = MonitorProcess(**options)
+        self.poll_interval = poll_interval
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._pump)
+
+    def start(self):
+        self.process.start()
+        self._timer.start(self.poll_interval)
+
+    def isRunning(self):
+        return self.process.is_alive()
+
+    def _pump(self):
+        for event in self.process.poll():
+            kind = event[0]
+            if kind == 'status':
+                self.status_signal.emit(event[1])
+            elif kind == 'target_status':
+                self.target_status_signal.emit(*event[1:])
+            elif kind == 'stats':
+                self.stats_signal.emit(event[1])
+            elif kind == 'exit':
+                self._timer.stop()
+                if event[1]:
+                    self.status_signal.emit(f'监控进程异常退出（退出码{event[1]}）')
+                self.finished.emit()
+
+    def update_target(self, row):
+        self.process.update_target(row)
+
+    def remove_target(self, target_id):
+        self.process.remove_target(target_id)
 
     def stop(self):
-        self.running = False
\ No newline at end of file
+        self.process.stop()
+
+    def wait(self, msecs=10000):
+        # 子进程没有按时退出时强制结束，不让界面一直卡住
+        return self.process.join(None if msecs is None else msecs / 1000)
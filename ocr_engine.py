@@ -0,0 +1,353 @@
+import bisect
+import ctypes
+import ctypes.util
+import glob
+import locale
+import os
+import platform
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# 多行文本块的页面分割模式，拼图识别时使用
+BLOCK_PSM = 6
+
+
+class LatencyStats:
+    """
+    记录每次调用耗时（秒），保留最近window次用于计算分位数
+    """
+    def __init__(self, window=200):
+        self.count = 0
+        self.total = 0.0
+        self.last = 0.0
+        self.max = 0.0
+        self._recent = deque(maxlen=window)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        self.max = max(self.max, seconds)
+        self._recent.append(seconds)
+
+    def percentile(self, q):
+        if not self._recent:
+            return 0.0
+        return float(np.percentile(np.fromiter(self._recent, dtype=np.float64), q))
+
+    @property
+    def avg(self):
+        return self.total / self.count if self.count else 0.0
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'avg_ms': self.avg * 1000,
+            'last_ms': self.last * 1000,
+            'p95_ms': self.percentile(95) * 1000,
+            'max_ms': self.max * 1000,
+        }
+
+
+class OcrEngine:
+    """
+    OCR后端基类。子类实现_recognize(image)，image可以是PIL图片或NumPy数组（灰度或RGB）。
+    """
+    name = 'base'
+
+    def __init__(self, psm=7):
+        self.psm = psm
+        self.latency = LatencyStats()
+
+    def recognize(self, image):
+        start = time.perf_counter()
+        try:
+            return self._recognize(image)
+        finally:
+            self.latency.add(time.perf_counter() - start)
+
+    def _recognize(self, image):
+        raise NotImplementedError
+
+    def recognize_words(self, image):
+        """
+        按多行文本块（psm 6）识别一张图片，返回每个词及其位置[(text, left, top, width, height), ...]。
+        不支持的后端抛出NotImplementedError
+        """
+        start = time.perf_counter()
+        try:
+            return parse_tsv_words(self._recognize_block(image))
+        finally:
+            self.latency.add(time.perf_counter() - start)
+
+    def _recognize_block(self, image):
+        # 返回tesseract的TSV格式结果
+        raise NotImplementedError
+
+    def recognize_many(self, images):
+        """
+        一次识别多张图片，返回与images顺序一致的文本列表。默认逐张识别，子类可以并行或批量处理。
+        """
+        return [self.recognize(image) for image in images]
+
+    def close(self):
+        pass
+
+
+class PytesseractEngine(OcrEngine):
+    """
+    每次调用启动一个tesseract进程（原有方式），作为兜底后端
+    """
+    name = 'pytesseract'
+
+    def __init__(self, tesseract_dir=None, psm=7):
+        super().__init__(psm)
+        import pytesseract
+        self._pytesseract = pytesseract
+        if tesseract_dir:
+            exe = os.path.join(tesseract_dir, 'tesseract.exe' if platform.system() == 'Windows' else 'tesseract')
+            if os.path.exists(exe):
+                pytesseract.pytesseract.tesseract_cmd = exe
+
+    def _recognize(self, image):
+        return self._pytesseract.image_to_string(image, config=f'--psm {self.psm}')
+
+    def _recognize_block(self, image):
+        return self._pytesseract.image_to_data(image, config=f'--psm {BLOCK_PSM}')
+
+
+def _find_libtesseract(tesseract_dir=None):
+    if tesseract_dir:
+        for pattern in ('libtesseract*.dll', 'tesseract*.dll', 'libtesseract*.so*', 'libtesseract*.dylib'):
+            found = sorted(glob.glob(os.path.join(tesseract_dir, pattern)))
+            if found:
+                return found[-1]
+    return ctypes.util.find_library('tesseract') or ctypes.util.find_library('libtesseract-5')
+
+
+class TesseractApiEngine(OcrEngine):
+    """
+    通过ctypes调用libtesseract的C API，在进程内常驻一个TessBaseAPI实例，
+    省去每帧启动进程、写临时图片和解析stdout的开销。
+    """
+    name = 'tesseract-api'
+
+    def __init__(self, tesseract_dir=None, lang='eng', psm=7, dpi=70):
+        super().__init__(psm)
+        lib_path = _find_libtesseract(tesseract_dir)
+        if not lib_path:
+            raise OSError('未找到libtesseract动态库')
+        if platform.system() == 'Windows' and tesseract_dir and os.path.isdir(tesseract_dir):
+            # 让随包附带的leptonica等依赖DLL可以被找到
+            os.add_dll_directory(tesseract_dir)
+        lib = ctypes.CDLL(lib_path)
+        lib.TessBaseAPICreate.restype = ctypes.c_void_p
+        lib.TessBaseAPIInit3.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p]
+        lib.TessBaseAPIInit3.restype = ctypes.c_int
+        lib.TessBaseAPISetPageSegMode.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        lib.TessBaseAPISetImage.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int,
+                                            ctypes.c_int, ctypes.c_int, ctypes.c_int]
+        lib.TessBaseAPISetSourceResolution.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        lib.TessBaseAPIGetUTF8Text.argtypes = [ctypes.c_void_p]
+        lib.TessBaseAPIGetUTF8Text.restype = ctypes.c_void_p
+        # 3.05之前的版本没有TSV输出，拼图识别会回退为逐张识别
+        self._has_tsv = hasattr(lib, 'TessBaseAPIGetTsvText')
+        if self._has_tsv:
+            lib.TessBaseAPIGetTsvText.argtypes = [ctypes.c_void_p, ctypes.c_int]
+            lib.TessBaseAPIGetTsvText.restype = ctypes.c_void_p
+        lib.TessDeleteText.argtypes = [ctypes.c_void_p]
+        lib.TessBaseAPIClear.argtypes = [ctypes.c_void_p]
+        lib.TessBaseAPIEnd.argtypes = [ctypes.c_void_p]
+        lib.TessBaseAPIDelete.argtypes = [ctypes.c_void_p]
+        self._lib = lib
+        self._dpi = dpi
+        # 部分tesseract版本要求数字格式为C locale（Qt可能会修改它）
+        locale.setlocale(locale.LC_NUMERIC, 'C')
+        datapath = None
+        if tesseract_dir and os.path.isdir(os.path.join(tesseract_dir, 'tessdata')):
+            datapath = os.path.join(tesseract_dir, 'tessdata').encode('utf-8')
+        self._handle = lib.TessBaseAPICreate()
+        if lib.TessBaseAPIInit3(self._handle, datapath, lang.encode('utf-8')) != 0:
+            lib.TessBaseAPIDelete(self._handle)
+            self._handle = None
+            raise OSError('tesseract初始化失败，请检查tessdata')
+        lib.TessBaseAPISetPageSegMode(self._handle, psm)
+        self._lock = threading.Lock()
+
+    def _recognize(self, image):
+        return self._read(image, self.psm)
+
+    def _recognize_block(self, image):
+        if not self._has_tsv:
+            raise NotImplementedError('libtesseract版本过旧，不支持TSV输出')
+        return self._read(image, BLOCK_PSM, tsv=True)
+
+    def _read(self, image, psm, tsv=False):
+        pixels = np.ascontiguousarray(np.asarray(image), dtype=np.uint8)
+        if pixels.ndim == 3 and pixels.shape[2] == 4:
+            pixels = np.ascontiguousarray(pixels[:, :, :3])
+        h, w = pixels.shape[:2]
+        bytes_per_pixel = 1 if pixels.ndim == 2 else pixels.shape[2]
+        lib = self._lib
+        with self._lock:
+            if psm != self.psm:
+                lib.TessBaseAPISetPageSegMode(self._handle, psm)
+            lib.TessBaseAPISetImage(self._handle, pixels.ctypes.data, w, h, bytes_per_pixel, pixels.strides[0])
+            lib.TessBaseAPISetSourceResolution(self._handle, self._dpi)
+            text_ptr = lib.TessBaseAPIGetTsvText(self._handle, 0) if tsv else lib.TessBaseAPIGetUTF8Text(self._handle)
+            try:
+                text = ctypes.string_at(text_ptr).decode('utf-8', errors='ignore') if text_ptr else ''
+            finally:
+                if text_ptr:
+                    lib.TessDeleteText(text_ptr)
+                lib.TessBaseAPIClear(self._handle)
+                if psm != self.psm:
+                    lib.TessBaseAPISetPageSegMode(self._handle, self.psm)
+        return text
+
+    def close(self):
+        if self._handle:
+            self._lib.TessBaseAPIEnd(self._handle)
+            self._lib.TessBaseAPIDelete(self._handle)
+            self._handle = None
+
+
+def parse_tsv_words(tsv):
+    """
+    从tesseract的TSV结果中取出词级别（level 5）的非空文本及其位置，保持tesseract的阅读顺序
+    """
+    words = []
+    for line in tsv.splitlines():
+        fields = line.split('\t')
+        if len(fields) < 12 or fields[0] != '5':
+            continue
+        text = fields[11].strip()
+        if text:
+            left, top, width, height = (int(v) for v in fields[6:10])
+            words.append((text, left, top, width, height))
+    return words
+
+
+def build_mosaic(images, pad=12):
+    """
+    把多张识别区域竖直拼成一张白底图片，每张一行、左对齐，行与行之间和四周留pad像素空白。
+    各区域统一转为浅底深字（深色背景的区域取反），整张图片的二值化才能同时照顾到所有区域。
+    返回(拼图, 每个区域在拼图中的行范围[(y0, y1), ...])
+    """
+    crops = []
+    for image in images:
+        crop = np.asarray(image)
+        if crop.ndim == 3:
+            # 与cv2.COLOR_RGB2GRAY相同的权重
+            crop = (crop[..., :3] @ np.array([0.299, 0.587, 0.114])).astype(np.uint8)
+        if crop.mean() < 128:
+            crop = 255 - crop
+        crops.append(crop)
+    width = max(crop.shape[1] for crop in crops) + 2 * pad
+    height = sum(crop.shape[0] for crop in crops) + pad * (len(crops) + 1)
+    mosaic = np.full((height, width), 255, dtype=np.uint8)
+    bands = []
+    y = pad
+    for crop in crops:
+        h, w = crop.shape
+        mosaic[y:y + h, pad:pad + w] = crop
+        bands.append((y, y + h))
+        y += h + pad
+    return mosaic, bands
+
+
+def assign_words(words, bands, pad):
+    """
+    按词的纵向位置把词分回各个区域：每个区域的范围向上下各扩展半个间隔。
+    返回(每个区域的文本, 不可靠的区域下标集合)。词框跨越多个区域时，涉及的区域都不可靠；
+    同一区域中的词不在同一行（纵向互不重叠，即区域被识别成了多行）时该区域也不可靠
+    """
+    half = pad / 2
+    starts = [y0 - half for y0, _ in bands]
+    texts = [[] for _ in bands]
+    # 每个区域中词框的最大top和最小bottom，max_top >= min_bottom说明有两个词不在同一行
+    rows = [[float('-inf'), float('inf')] for _ in bands]
+    unreliable = set()
+    for text, left, top, width, height in words:
+        bottom = top + height
+        first = max(0, bisect.bisect_right(starts, top) - 1)
+        last = max(0, bisect.bisect_left(starts, bottom) - 1)
+        if first != last:
+            unreliable.update(range(first, last + 1))
+            continue
+        y0, y1 = bands[first]
+        if top < y0 - half or bottom > y1 + half:
+            unreliable.add(first)
+            continue
+        texts[first].append(text)
+        row = rows[first]
+        row[0], row[1] = max(row[0], top), min(row[1], bottom)
+        if row[0] >= row[1]:
+            unreliable.add(first)
+    return [' '.join(parts) for parts in texts], unreliable
+
+
+class MosaicOcrEngine(OcrEngine):
+    """
+    批量识别时把同一轮的所有区域拼成一张图片（build_mosaic），只调用一次tesseract（psm 6，每个区域一行），
+    再按每个词的位置（TSV结果中的词框）把文本分回所在的区域，多个目标分摊一次识别的固定开销。
+    没有识别出文字或词框跨越区域边界的区域单独逐张识别；整次识别出错时全部逐张识别。
+    """
+    def __init__(self, base, min_batch=2, pad=12):
+        super().__init__(base.psm)
+        self.name = f'mosaic+{base.name}'
+        self.base = base
+        # 延迟统计与底层引擎共用，界面中显示的是实际每次调用tesseract的耗时
+        self.latency = base.latency
+        self.min_batch = min_batch
+        self.pad = pad
+        self.mosaic_reads = 0
+        # 回退为逐张识别的区域数
+        self.mosaic_fallbacks = 0
+
+    def recognize(self, image):
+        return self.base.recognize(image)
+
+    def recognize_many(self, images):
+        if len(images) < self.min_batch:
+            return self.base.recognize_many(images)
+        mosaic, bands = build_mosaic(images, self.pad)
+        try:
+            words = self.base.recognize_words(mosaic)
+        except Exception:
+            self.mosaic_fallbacks += len(images)
+            return self.base.recognize_many(images)
+        texts, unreliable = assign_words(words, bands, self.pad)
+        retry = [i for i, text in enumerate(texts) if not text or i in unreliable]
+        if len(retry) < len(images):
+            self.mosaic_reads += 1
+        if retry:
+            self.mosaic_fallbacks += len(retry)
+            for i, text in zip(retry, self.base.recognize_many([images[i] for i in retry])):
+                texts[i] = text
+        return texts
+
+    def close(self):
+        self.base.close()
+
+
+OCR_BACKENDS = {
+    'tesseract-api': TesseractApiEngine,
+    'pytesseract': PytesseractEngine,
+}
+
+
+def create_ocr_engine(backend='auto', tesseract_dir=None, psm=7):
+    """
+    创建OCR引擎。backend='auto'时优先使用常驻的C API引擎，加载失败则回退到pytesseract。
+    """
+    if backend != 'auto':
+        return OCR_BACKENDS[backend](tesseract_dir=tesseract_dir, psm=psm)
+    try:
+        return TesseractApiEngine(tesseract_dir=tesseract_dir, psm=psm)
+    except Exception as e:
+        print("tesseract C API不可用，回退到pytesseract。", e)
+        return PytesseractEngine(tesseract_dir=tesseract_dir, psm=psm)
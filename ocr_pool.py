@@ -0,0 +1,91 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from ocr_engine import OcrEngine, create_ocr_engine
+
+# 子进程中常驻的OCR引擎，由进程池初始化函数创建
+_engine = None
+
+
+def _init_worker(backend, tesseract_dir, glyph_model, glyph_min_confidence):
+    global _engine
+    _engine = create_ocr_engine(backend, tesseract_dir)
+    if glyph_model and os.path.exists(glyph_model):
+        from digit_recognizer import GlyphRecognizer, GlyphOcrEngine
+        _engine = GlyphOcrEngine(GlyphRecognizer.load(glyph_model), _engine, glyph_min_confidence)
+
+
+def _recognize(image):
+    # 异常转成字符串返回，部分OCR库的异常类型无法在进程间pickle，会导致整个进程池损坏
+    start = time.perf_counter()
+    try:
+        text = _engine.recognize(image)
+    except Exception as e:
+        return None, time.perf_counter() - start, f'{type(e).__name__}: {e}'
+    return text, time.perf_counter() - start, None
+
+
+class OcrProcessPool(OcrEngine):
+    """
+    多进程OCR：每个子进程常驻一个OCR引擎，多个目标的识别区域分发到不同进程并行识别，绕开GIL。
+    同时在途的识别任务不超过max_pending个，超过时submit阻塞，对上游形成背压。
+    latency记录的是子进程内的单次识别耗时。
+    """
+    def __init__(self, workers=None, max_pending=None, backend='auto', tesseract_dir=None,
+                 glyph_model=None, glyph_min_confidence=0.85, psm=7):
+        super().__init__(psm)
+        self.workers = workers or os.cpu_count() or 1
+        self.name = f'pool[{self.workers}]'
+        self._slots = threading.BoundedSemaphore(max_pending or self.workers * 2)
+        # 统一用spawn启动子进程，避免在带Qt线程的进程中fork
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'), initializer=_init_worker,
+            initargs=(backend, tesseract_dir, glyph_model, glyph_min_confidence))
+
+    def submit(self, image, callback=None):
+        """
+        提交一张图片，返回Future，结果为识别文本。callback(text, error)在结果返回后于后台线程中调用。
+        """
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(_recognize, image)
+        except Exception:
+            self._slots.release()
+            raise
+
+        def done(f):
+            self._slots.release()
+            error = f.exception()
+            text = None
+            if error is None:
+                text, elapsed, message = f.result()
+                self.latency.add(elapsed)
+                if message:
+                    error = RuntimeError(message)
+            if callback:
+                callback(text, error)
+        future.add_done_callback(done)
+        return future
+
+    @staticmethod
+    def _result(future):
+        text, _, message = future.result()
+        if message:
+            raise RuntimeError(message)
+        return text
+
+    def _recognize(self, image):
+        return self._result(self.submit(image))
+
+    def recognize(self, image):
+        return self._recognize(image)
+
+    def recognize_many(self, images):
+        futures = [self.submit(image) for image in images]
+        return [self._result(future) for future in futures]
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
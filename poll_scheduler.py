@@ -0,0 +1,48 @@
+def threshold_band(min_threshold, max_threshold, ratio):
+    """
+    阈值附近的边界宽度。同时设置上下限时为区间宽度的ratio倍；
+    只设置一侧时为该阈值绝对值的ratio倍（至少为ratio）；都未设置时返回None。
+    """
+    if min_threshold is not None and max_threshold is not None:
+        return (max_threshold - min_threshold) * ratio
+    limit = min_threshold if min_threshold is not None else max_threshold
+    if limit is None:
+        return None
+    return max(abs(limit), 1) * ratio
+
+
+def near_threshold(value, min_threshold, max_threshold, ratio=0.1):
+    """
+    判断数值是否在阈值边界附近（threshold_band以内）
+    """
+    if value is None:
+        return False
+    band = threshold_band(min_threshold, max_threshold, ratio)
+    if band is None:
+        return False
+    for limit in (min_threshold, max_threshold):
+        if limit is not None and abs(value - limit) <= band:
+            return True
+    return False
+
+
+class AdaptivePoller:
+    """
+    自适应轮询间隔：数值在变化或接近阈值时按最短间隔轮询，
+    数值稳定或目标丢失时按backoff倍数指数退避，直到最长间隔。
+    """
+    def __init__(self, min_interval=0.5, max_interval=3.0, backoff=1.5):
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.backoff = backoff
+        self.interval = min_interval
+
+    def next_interval(self, urgent):
+        if urgent:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+        return self.interval
+
+    def reset(self):
+        self.interval = self.min_interval
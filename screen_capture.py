@@ -0,0 +1,226 @@
+import os
+import queue
+import time
+
+import numpy as np
+import cv2
+
+
+class ScreenGrabber:
+    """
+    整屏截图，直接转换为灰度NumPy帧返回，不再经过screen.png落盘。默认用pyautogui截图，
+    子类重写_pixels()即可接入其它截图方式。
+    灰度缓冲区在每次截图之间复用，只有分辨率变化时才重新分配。
+    注意：grab()返回的是内部缓冲区，下一次grab()会覆盖它，需要跨帧保留时请自行copy()。
+    """
+    name = 'pyautogui'
+    # _pixels()返回的彩色通道顺序：RGB / BGR
+    channel_order = 'RGB'
+    # 回放源播放完毕时为True，监控循环据此停止
+    exhausted = False
+
+    def __init__(self):
+        self._gray = None
+
+    def _pixels(self):
+        import pyautogui
+        # PIL图片通过__array_interface__直接转为数组，无需编码/解码PNG
+        return np.asarray(pyautogui.screenshot())
+
+    def _ensure_buffer(self, h, w):
+        if self._gray is None or self._gray.shape != (h, w):
+            self._gray = np.empty((h, w), dtype=np.uint8)
+        return self._gray
+
+    def grab(self, out=None, reuse=True):
+        """
+        out为外部提供的缓冲区（如FramePool中的帧），尺寸不符时会分配新的缓冲区并返回。
+        out为None时，reuse=True写入内部缓冲区；reuse=False则分配新的缓冲区（帧会被其它线程持有时使用）
+        """
+        pixels = self._pixels()
+        h, w = pixels.shape[:2]
+        if out is None and reuse:
+            gray = self._ensure_buffer(h, w)
+        elif out is None or out.shape != (h, w):
+            gray = np.empty((h, w), dtype=np.uint8)
+        else:
+            gray = out
+        bgr = self.channel_order == 'BGR'
+        if pixels.ndim == 2:
+            np.copyto(gray, pixels)
+        elif pixels.shape[2] == 4:
+            cv2.cvtColor(pixels, cv2.COLOR_BGRA2GRAY if bgr else cv2.COLOR_RGBA2GRAY, dst=gray)
+        else:
+            cv2.cvtColor(pixels, cv2.COLOR_BGR2GRAY if bgr else cv2.COLOR_RGB2GRAY, dst=gray)
+        return gray
+
+    def close(self):
+        pass
+
+
+class MssGrabber(ScreenGrabber):
+    """
+    基于mss的原生截图（Windows用BitBlt，Linux用Xlib，macOS用CoreGraphics），比pyautogui快得多。
+    monitor为mss的显示器序号：1为主显示器，0为所有显示器拼接的整个桌面。
+    mss实例只能在创建它的线程中使用，因此在第一次grab()时才创建。
+    """
+    name = 'mss'
+    channel_order = 'BGR'
+
+    def __init__(self, monitor=1):
+        super().__init__()
+        import mss  # noqa: F401 可选依赖，未安装时在创建时就报错
+        self.monitor = monitor
+        self._sct = None
+
+    def _pixels(self):
+        if self._sct is None:
+            import mss
+            self._sct = mss.mss()
+        # BGRA像素，直接映射为数组
+        return np.asarray(self._sct.grab(self._sct.monitors[self.monitor]))
+
+    def close(self):
+        if self._sct is not None:
+            self._sct.close()
+            self._sct = None
+
+
+class ReplayGrabber(ScreenGrabber):
+    """
+    从录制的截图目录或视频文件回放画面，用于无显示器环境下的回归测试和基准测试。
+    fps>0时按真实时间推进：每次grab()返回当前时刻应显示的那一帧，与真实屏幕一样可能跳过若干帧；
+    fps<=0时每次grab()依次返回下一帧。loop=False时播放到最后一帧后exhausted置为True。
+    """
+    name = 'replay'
+    channel_order = 'BGR'
+    IMAGE_EXTS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+    def __init__(self, source, fps=0, loop=True):
+        super().__init__()
+        if not os.path.exists(source):
+            raise FileNotFoundError(f'回放源不存在: {source}')
+        self.source = source
+        self.fps = fps
+        self.loop = loop
+        self.frames_read = 0
+        self._index = -1
+        self._frame = None
+        self._start = None
+        self._capture = None
+        if os.path.isdir(source):
+            self._files = [os.path.join(source, f) for f in sorted(os.listdir(source))
+                           if os.path.splitext(f)[1].lower() in self.IMAGE_EXTS]
+            if not self._files:
+                raise ValueError(f'回放目录中没有图片: {source}')
+            self._count = len(self._files)
+        else:
+            self._files = None
+            self._capture = cv2.VideoCapture(source)
+            if not self._capture.isOpened():
+                raise ValueError(f'无法打开回放视频: {source}')
+            self._count = int(self._capture.get(cv2.CAP_PROP_FRAME_COUNT)) or None
+
+    def _target_index(self):
+        if self.fps and self.fps > 0:
+            if self._start is None:
+                self._start = time.monotonic()
+            index = int((time.monotonic() - self._start) * self.fps)
+        else:
+            index = self._index + 1
+        if self._count and index >= self._count:
+            if self.loop:
+                index %= self._count
+            else:
+                self.exhausted = True
+                index = self._count - 1
+        return index
+
+    def _read_image(self, index):
+        # 用np.fromfile + imdecode读取，兼容中文路径
+        data = np.fromfile(self._files[index], dtype=np.uint8)
+        return cv2.imdecode(data, cv2.IMREAD_GRAYSCALE)
+
+    def _read_video(self, index):
+        if index < self._index:
+            # 循环回到开头
+            self._capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            self._index = -1
+        # 顺序跳过中间帧（只grab不解码），比按帧号seek快
+        while self._index < index - 1:
+            if not self._capture.grab():
+                break
+            self._index += 1
+        ok, frame = self._capture.read()
+        if not ok:
+            if self.loop and self._index >= 0:
+                self._count = self._index + 1
+                return self._read_video(0)
+            self.exhausted = True
+            return self._frame
+        self._index = index
+        return frame
+
+    def _pixels(self):
+        index = self._target_index()
+        if index != self._index or self._frame is None:
+            if self._files is not None:
+                frame = self._read_image(index)
+                self._index = index
+            else:
+                frame = self._read_video(index)
+            if frame is None:
+                raise ValueError(f'回放帧读取失败: {self.source} #{index}')
+            self._frame = frame
+            self.frames_read += 1
+        return self._frame
+
+    def close(self):
+        if self._capture is not None:
+            self._capture.release()
+            self._capture = None
+
+
+CAPTURE_BACKENDS = {
+    'pyautogui': ScreenGrabber,
+    'mss': MssGrabber,
+    'replay': ReplayGrabber,
+}
+
+
+def create_grabber(backend='auto', **options):
+    """
+    创建截图后端。backend='auto'时优先使用mss，未安装则回退到pyautogui；
+    options为后端参数，如replay的source / fps / loop，mss的monitor。
+    """
+    if backend != 'auto':
+        return CAPTURE_BACKENDS[backend](**options)
+    try:
+        return MssGrabber(**options)
+    except ImportError:
+        return ScreenGrabber()
+
+
+class FramePool:
+    """
+    流水线用的帧缓冲池。截图阶段acquire()一块缓冲区写入，下游阶段用完后release()归还，
+    池中没有空闲缓冲区时acquire()会阻塞，形成背压。缓冲区在第一次截图时才按屏幕尺寸分配：
+    acquire()得到None时应以grab(out=None, reuse=False)截图，由截图后端分配新的缓冲区，
+    之后这块缓冲区随release()留在池中，池中的size块缓冲区互不重叠。
+    """
+    def __init__(self, size=3):
+        self._free = queue.Queue()
+        for _ in range(size):
+            self._free.put(None)
+
+    def acquire(self, timeout=None):
+        """
+        返回(是否成功, 缓冲区)，缓冲区尚未分配时为None
+        """
+        try:
+            return True, self._free.get(timeout=timeout)
+        except queue.Empty:
+            return False, None
+
+    def release(self, buf):
+        self._free.put(buf)
@@ -1,5 +1,8 @@
 import sqlite3
 import datetime
+import csv
+import json
+from value_store import open_values_db
 
 class Task:
     def __init__(self, name, desc, deadline, status="未开始", task_id=None):
@@ -18,13 +21,16 @@ class RecordTask:
         self.create_time = create_time
 
 class TaskManager:
-    def __init__(self, db_path="tasks.db"):
+    def __init__(self, db_path="tasks.db", values_db_path="monitor_values.db"):
         self.db_path = db_path
+        self.values_db_path = values_db_path
+        self._values_conn = None
         self.conn = sqlite3.connect(self.db_path)
         self._create_table()
         self._create_record_table()
         self._create_schedule_table()
         self._create_monitor_threshold_table()
+        self._create_monitor_rule_table()
 
     def _create_table(self):
         c = self.conn.cursor()
@@ -75,9 +81,47 @@ class TaskManager:
                 template_path TEXT,
                 min_threshold REAL,
                 max_threshold REAL,
+                create_time TEXT,
+                last_x INTEGER,
+                last_y INTEGER,
+                pyramid_levels INTEGER,
+                ocr_dx INTEGER,
+                ocr_dy INTEGER,
+                ocr_w INTEGER,
+                ocr_h INTEGER,
+                ocr_preset TEXT
+            )
+        ''')
+        self.conn.commit()
+        # 兼容旧数据库：补齐新增的列
+        self._ensure_columns('monitor_thresholds', [('last_x', 'INTEGER'), ('last_y', 'INTEGER'), ('pyramid_levels', 'INTEGER'),
+                                                      ('ocr_dx', 'INTEGER'), ('ocr_dy', 'INTEGER'), ('ocr_w', 'INTEGER'), ('ocr_h', 'INTEGER'),
+                                                      ('ocr_preset', 'TEXT')])
+
+    def _create_monitor_rule_table(self):
+        # 监控目标的告警规则（见alert_rules.py），params为JSON格式的规则参数
+        c = self.conn.cursor()
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS monitor_rules (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                threshold_id INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                params TEXT,
                 create_time TEXT
             )
         ''')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_monitor_rules_threshold ON monitor_rules (threshold_id)')
+        # 表没有外键约束，删除目标的地方都要一并删除规则；这里清理旧版本关闭程序时清空目标表留下的孤立规则
+        c.execute('DELETE FROM monitor_rules WHERE threshold_id NOT IN (SELECT id FROM monitor_thresholds)')
+        self.conn.commit()
+
+    def _ensure_columns(self, table, columns):
+        c = self.conn.cursor()
+        c.execute(f'PRAGMA table_info({table})')
+        existing = {row[1] for row in c.fetchall()}
+        for name, col_type in columns:
+            if name not in existing:
+                c.execute(f'ALTER TABLE {table} ADD COLUMN {name} {col_type}')
         self.conn.commit()
 
     def add_task(self, name, desc, deadline, status="未开始"):
@@ -156,10 +200,13 @@ class TaskManager:
         self.conn.commit()
         return c.lastrowid
 
-    def update_monitor_threshold(self, threshold_id, min_threshold=None, max_threshold=None, template_path=None):
+    def update_monitor_threshold(self, threshold_id, min_threshold=None, max_threshold=None, template_path=None, name=None):
         c = self.conn.cursor()
         sql = 'UPDATE monitor_thresholds SET '
         params = []
+        if name is not None:
+            sql += 'name=?, '
+            params.append(name)
         if min_threshold is not None:
             sql += 'min_threshold=?, '
             params.append(min_threshold)
@@ -174,12 +221,146 @@ class TaskManager:
         c.execute(sql, tuple(params))
         self.conn.commit()
 
+    def update_monitor_pyramid_levels(self, threshold_id, pyramid_levels):
+        # 每个模板单独配置金字塔层数，None表示使用默认值
+        c = self.conn.cursor()
+        c.execute('UPDATE monitor_thresholds SET pyramid_levels=? WHERE id=?', (pyramid_levels, threshold_id))
+        self.conn.commit()
+
+    def update_monitor_ocr_box(self, threshold_id, dx=None, dy=None, w=None, h=None):
+        # 识别区域相对模板左上角的偏移和尺寸，None表示与模板区域一致
+        c = self.conn.cursor()
+        c.execute('UPDATE monitor_thresholds SET ocr_dx=?, ocr_dy=?, ocr_w=?, ocr_h=? WHERE id=?', (dx, dy, w, h, threshold_id))
+        self.conn.commit()
+
+    def update_monitor_ocr_preset(self, threshold_id, preset):
+        # OCR预处理预设名称（见ocr_preprocess.PRESETS），None表示不处理
+        c = self.conn.cursor()
+        c.execute('UPDATE monitor_thresholds SET ocr_preset=? WHERE id=?', (preset, threshold_id))
+        self.conn.commit()
+
+    def update_monitor_location(self, threshold_id, x, y):
+        # 记录模板最后一次匹配到的位置，重启监控时优先在该位置附近搜索
+        c = self.conn.cursor()
+        c.execute('UPDATE monitor_thresholds SET last_x=?, last_y=? WHERE id=?', (x, y, threshold_id))
+        self.conn.commit()
+
     def get_monitor_thresholds(self):
         c = self.conn.cursor()
         c.execute('SELECT id, name, template_path, min_threshold, max_threshold, create_time FROM monitor_thresholds')
         return c.fetchall()
 
+    def get_monitor_targets(self):
+        # 监控引擎需要的完整目标配置
+        c = self.conn.cursor()
+        c.execute('SELECT id, name, template_path, min_threshold, max_threshold, last_x, last_y, pyramid_levels, '
+                  'ocr_dx, ocr_dy, ocr_w, ocr_h, ocr_preset FROM monitor_thresholds ORDER BY id')
+        return c.fetchall()
+
     def remove_monitor_threshold(self, threshold_id):
         c = self.conn.cursor()
         c.execute('DELETE FROM monitor_thresholds WHERE id=?', (threshold_id,))
-        self.conn.commit()
\ No newline at end of file
+        c.execute('DELETE FROM monitor_rules WHERE threshold_id=?', (threshold_id,))
+        self.conn.commit()
+
+    def set_monitor_rules(self, threshold_id, rules):
+        # 整体替换目标的告警规则，rules为[{'kind': ..., 参数...}, ...]
+        c = self.conn.cursor()
+        create_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        c.execute('DELETE FROM monitor_rules WHERE threshold_id=?', (threshold_id,))
+        for rule in rules:
+            params = {name: value for name, value in rule.items() if name != 'kind'}
+            c.execute('INSERT INTO monitor_rules (threshold_id, kind, params, create_time) VALUES (?, ?, ?, ?)',
+                      (threshold_id, rule['kind'], json.dumps(params), create_time))
+        self.conn.commit()
+
+    def get_monitor_rules(self, threshold_id):
+        c = self.conn.cursor()
+        c.execute('SELECT kind, params FROM monitor_rules WHERE threshold_id=? ORDER BY id', (threshold_id,))
+        return [{'kind': kind, **json.loads(params or '{}')} for kind, params in c.fetchall()]
+
+    # 监控数值时序数据（独立的monitor_values.db）
+    @property
+    def values_conn(self):
+        if self._values_conn is None:
+            self._values_conn = open_values_db(self.values_db_path)
+        return self._values_conn
+
+    @staticmethod
+    def _to_ts(t):
+        # 支持datetime、'%Y-%m-%d %H:%M:%S'字符串或时间戳
+        if t is None:
+            return None
+        if isinstance(t, datetime.datetime):
+            return t.timestamp()
+        if isinstance(t, str):
+            return datetime.datetime.strptime(t, "%Y-%m-%d %H:%M:%S").timestamp()
+        return float(t)
+
+    def _values_range_sql(self, target, start, end):
+        # target为目标ID（整数）；也可以是名称，用于查询还没有target_id的旧数据
+        sql, params = ' WHERE 1=1', []
+        if isinstance(target, int):
+            sql += ' AND target_id=?'
+            params.append(target)
+        elif target is not None:
+            sql += ' AND target=?'
+            params.append(target)
+        if start is not None:
+            sql += ' AND ts>=?'
+            params.append(self._to_ts(start))
+        if end is not None:
+            sql += ' AND ts<?'
+            params.append(self._to_ts(end))
+        return sql, params
+
+    def get_monitor_value_targets(self):
+        """
+        返回有数值记录的目标[(目标ID, 最近一次写入时的名称), ...]；旧数据没有目标ID，按名称区分，ID为None
+        """
+        c = self.values_conn.cursor()
+        c.execute("SELECT target_id, target, MAX(ts) FROM monitor_values "
+                  "GROUP BY COALESCE(target_id, 'name:' || target) ORDER BY target_id, target")
+        return [(target_id, target) for target_id, target, _ in c.fetchall()]
+
+    def get_monitor_values(self, target, start=None, end=None, limit=None):
+        """
+        按时间范围读取某个目标的原始数值，返回[(ts, value, raw), ...]
+        """
+        where, params = self._values_range_sql(target, start, end)
+        sql = 'SELECT ts, value, raw FROM monitor_values' + where + ' ORDER BY ts'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(int(limit))
+        c = self.values_conn.cursor()
+        c.execute(sql, params)
+        return c.fetchall()
+
+    def aggregate_monitor_values(self, target, start=None, end=None, bucket_seconds=60):
+        """
+        降采样：按bucket_seconds秒分桶，返回[(桶起始ts, min, max, avg, count), ...]
+        """
+        where, params = self._values_range_sql(target, start, end)
+        sql = ('SELECT CAST(ts / ? AS INTEGER) * ? AS bucket, MIN(value), MAX(value), AVG(value), COUNT(value) '
+               'FROM monitor_values' + where + ' AND value IS NOT NULL GROUP BY bucket ORDER BY bucket')
+        c = self.values_conn.cursor()
+        c.execute(sql, [bucket_seconds, bucket_seconds] + params)
+        return c.fetchall()
+
+    def export_monitor_values_csv(self, file_path, target=None, start=None, end=None):
+        """
+        导出为CSV，逐行从游标读取写出，不会一次性把数据读入内存。返回导出的行数。
+        """
+        where, params = self._values_range_sql(target, start, end)
+        c = self.values_conn.cursor()
+        c.execute('SELECT target_id, target, ts, value, raw FROM monitor_values' + where + ' ORDER BY target_id, ts',
+                  params)
+        count = 0
+        with open(file_path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(['target_id', 'target', 'time', 'value', 'raw'])
+            for target_id, target_name, ts, value, raw in c:
+                time_text = datetime.datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+                writer.writerow([target_id, target_name, time_text, value, raw])
+                count += 1
+        return count
@@ -0,0 +1,114 @@
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from template_matcher import build_pyramid, max_pyramid_levels
+
+
+class TemplateData:
+    """
+    一张模板图片的预处理结果：灰度图、金字塔各层以及是否为纯色模板，数组均为只读，可在多个匹配器之间共享
+    """
+    def __init__(self, path, mtime, gray):
+        gray.setflags(write=False)
+        self.path = path
+        self.mtime = mtime
+        self.gray = gray
+        self.pyramid = [gray]
+        # 纯色模板的归一化相关系数没有意义，匹配结果不可信
+        self.flat = bool(gray.std() < 1e-6)
+
+    @property
+    def levels(self):
+        return len(self.pyramid) - 1
+
+    @property
+    def nbytes(self):
+        return sum(level.nbytes for level in self.pyramid)
+
+    def ensure_levels(self, levels):
+        """
+        保证金字塔至少有levels层（受模板尺寸限制），返回实际层数
+        """
+        levels = max_pyramid_levels(self.gray, levels or 0)
+        if levels > self.levels:
+            for level in build_pyramid(self.pyramid[-1], levels - self.levels)[1:]:
+                level.setflags(write=False)
+                self.pyramid.append(level)
+        return levels
+
+
+def read_template(path):
+    # 用PIL读取模板图片，兼容中文路径和多格式（含透明通道、灰度、调色板图片）
+    with Image.open(path) as image:
+        rgb = np.array(image.convert('RGB'))
+    return cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+
+
+class TemplateCache:
+    """
+    进程内的模板缓存，以(路径, 修改时间)为键：文件被替换后自动重新读取。
+    按占用内存做LRU淘汰，总大小不超过max_bytes。线程安全。
+    """
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path, pyramid_levels=0):
+        """
+        返回模板的TemplateData，金字塔至少构建到pyramid_levels层。文件不存在时抛出OSError。
+        """
+        path = os.path.abspath(path)
+        mtime = os.stat(path).st_mtime_ns
+        with self._lock:
+            data = self._entries.get(path)
+            if data is not None and data.mtime == mtime:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                data.ensure_levels(pyramid_levels)
+                self._evict()
+                return data
+        # 读取和灰度转换放在锁外，不阻塞其它线程命中缓存
+        data = TemplateData(path, mtime, read_template(path))
+        data.ensure_levels(pyramid_levels)
+        with self._lock:
+            self.misses += 1
+            self._entries[path] = data
+            self._entries.move_to_end(path)
+            self._evict()
+        return data
+
+    def _evict(self):
+        total = sum(data.nbytes for data in self._entries.values())
+        # 至少保留最近使用的一项
+        while total > self.max_bytes and len(self._entries) > 1:
+            _, data = self._entries.popitem(last=False)
+            total -= data.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            return sum(data.nbytes for data in self._entries.values())
+
+    @property
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+# 进程级共享实例，重新开始监控时直接复用已处理的模板
+template_cache = TemplateCache()
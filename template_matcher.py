@@ -0,0 +1,137 @@
+import cv2
+import numpy as np
+
+DEFAULT_PYRAMID_LEVELS = 2
+# 金字塔顶层模板的最小边长，太小会丢失特征导致粗匹配失准
+MIN_PYRAMID_TEMPLATE_SIZE = 12
+
+
+def build_pyramid(image, levels):
+    """
+    返回[原图, 1/2, 1/4, ...]共levels+1层图像
+    """
+    pyramid = [image]
+    for _ in range(levels):
+        pyramid.append(cv2.pyrDown(pyramid[-1]))
+    return pyramid
+
+
+def max_pyramid_levels(template, levels):
+    # 根据模板尺寸限制金字塔层数
+    h, w = template.shape[:2]
+    while levels > 0 and min(h, w) >> levels < MIN_PYRAMID_TEMPLATE_SIZE:
+        levels -= 1
+    return levels
+
+
+class TemplateMatcher:
+    """
+    模板匹配器，支持区域跟踪：找到目标后只在上次位置附近（加padding）搜索，
+    置信度低于阈值时回退到整屏搜索。
+    整屏搜索采用由粗到细的金字塔匹配：先在缩小的帧上匹配缩小的模板，
+    再在原分辨率下只对候选位置附近的小窗口精匹配。pyramid_levels=0时为逐像素穷举搜索。
+    template_pyramid为预先构建好的模板金字塔（如来自模板缓存），层数足够时不再重新构建。
+    """
+    def __init__(self, template, threshold=0.7, track=True, padding=None, last_loc=None,
+                 pyramid_levels=DEFAULT_PYRAMID_LEVELS, template_pyramid=None):
+        self.template = template
+        self.h, self.w = template.shape[:2]
+        self.threshold = threshold
+        self.track = track
+        # 默认向四周扩展一个模板大小
+        self.padding = padding if padding is not None else max(self.w, self.h)
+        self.last_loc = tuple(last_loc) if last_loc is not None else None
+        self.levels = max_pyramid_levels(template, pyramid_levels or 0)
+        if template_pyramid is not None and len(template_pyramid) > self.levels:
+            self._template_pyramid = list(template_pyramid[:self.levels + 1])
+        else:
+            self._template_pyramid = build_pyramid(template, self.levels)
+        self._frame_pyramid = [None] * (self.levels + 1)
+        self.roi_hits = 0
+        self.full_searches = 0
+        self.coarse_misses = 0
+
+    def _search(self, image, x0=0, y0=0):
+        res = cv2.matchTemplate(image, self.template, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, max_loc = cv2.minMaxLoc(res)
+        return max_val, (max_loc[0] + x0, max_loc[1] + y0)
+
+    def _window(self, frame, loc, padding):
+        fh, fw = frame.shape[:2]
+        lx, ly = loc
+        x0 = max(0, lx - padding)
+        y0 = max(0, ly - padding)
+        x1 = min(fw, lx + self.w + padding)
+        y1 = min(fh, ly + self.h + padding)
+        if x1 - x0 < self.w or y1 - y0 < self.h:
+            return None
+        return x0, y0, x1, y1
+
+    def _roi(self, frame):
+        return self._window(frame, self.last_loc, self.padding)
+
+    def _downscale(self, frame):
+        # 逐层缩小帧，各层缓冲区在多次调用之间复用
+        current = frame
+        for i in range(1, self.levels + 1):
+            h, w = current.shape[:2]
+            size = ((h + 1) // 2, (w + 1) // 2)
+            buf = self._frame_pyramid[i]
+            if buf is None or buf.shape != size:
+                buf = np.empty(size, dtype=frame.dtype)
+                self._frame_pyramid[i] = buf
+            cv2.pyrDown(current, dst=buf)
+            current = buf
+        return current
+
+    def match_exhaustive(self, frame):
+        """
+        原分辨率逐像素穷举搜索
+        """
+        return self._search(frame)
+
+    def match_pyramid(self, frame):
+        """
+        由粗到细的金字塔匹配，精匹配失败时回退到穷举搜索
+        """
+        if self.levels == 0:
+            return self.match_exhaustive(frame)
+        coarse = self._downscale(frame)
+        coarse_template = self._template_pyramid[-1]
+        ch, cw = coarse.shape[:2]
+        th, tw = coarse_template.shape[:2]
+        if ch < th or cw < tw:
+            return self.match_exhaustive(frame)
+        res = cv2.matchTemplate(coarse, coarse_template, cv2.TM_CCOEFF_NORMED)
+        _, _, _, coarse_loc = cv2.minMaxLoc(res)
+        scale = 1 << self.levels
+        candidate = (coarse_loc[0] * scale, coarse_loc[1] * scale)
+        # 粗匹配的定位误差约为一个缩放步长，窗口留出两倍余量
+        window = self._window(frame, candidate, scale * 2)
+        if window is not None:
+            x0, y0, x1, y1 = window
+            max_val, max_loc = self._search(frame[y0:y1, x0:x1], x0, y0)
+            if max_val >= self.threshold:
+                return max_val, max_loc
+        self.coarse_misses += 1
+        return self.match_exhaustive(frame)
+
+    def match(self, frame):
+        """
+        在灰度帧中查找模板，返回(max_val, max_loc)，max_loc为整帧坐标。
+        """
+        if self.track and self.last_loc is not None:
+            roi = self._roi(frame)
+            if roi is not None:
+                x0, y0, x1, y1 = roi
+                # 切片是视图，不复制帧数据
+                max_val, max_loc = self._search(frame[y0:y1, x0:x1], x0, y0)
+                if max_val >= self.threshold:
+                    self.roi_hits += 1
+                    self.last_loc = max_loc
+                    return max_val, max_loc
+        self.full_searches += 1
+        max_val, max_loc = self.match_pyramid(frame)
+        if max_val >= self.threshold:
+            self.last_loc = max_loc
+        return max_val, max_loc
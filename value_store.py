@@ -0,0 +1,97 @@
+import queue
+import sqlite3
+import threading
+import time
+
+
+def open_values_db(db_path='monitor_values.db'):
+    """
+    打开监控数值库（独立的SQLite文件，WAL模式），不存在时建表和索引。
+    WAL模式下写入不阻塞界面上的查询。
+    """
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS monitor_values (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            target TEXT NOT NULL,
+            ts REAL NOT NULL,
+            value REAL,
+            raw TEXT,
+            target_id INTEGER
+        )
+    ''')
+    # 目标名称不唯一且可以修改，按目标ID区分序列；target列只保存写入时的显示名称。旧库补齐target_id列
+    if 'target_id' not in {row[1] for row in conn.execute('PRAGMA table_info(monitor_values)')}:
+        conn.execute('ALTER TABLE monitor_values ADD COLUMN target_id INTEGER')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_monitor_values_target_ts ON monitor_values (target, ts)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_monitor_values_target_id_ts ON monitor_values (target_id, ts)')
+    conn.commit()
+    return conn
+
+
+class MonitorValueWriter:
+    """
+    监控数值的批量写入器：add()只入队，后台线程每flush_interval秒或攒够batch_size条时
+    在一个事务中批量插入。队列满时丢弃并计数，不阻塞监控线程。
+    """
+    def __init__(self, db_path='monitor_values.db', flush_interval=1.0, batch_size=500, max_queue=50000):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='value-writer', daemon=True)
+            self._thread.start()
+        return self
+
+    def add(self, target_id, target, ts, value, raw=None):
+        # target_id区分不同目标，target为显示名称
+        try:
+            self._queue.put_nowait((target_id, target, ts, value, raw))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        # sqlite连接只能在创建它的线程中使用，因此在后台线程里打开
+        conn = open_values_db(self.db_path)
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        try:
+            while not self._stop_event.is_set() or not self._queue.empty():
+                try:
+                    batch.append(self._queue.get(timeout=min(0.2, max(0.0, deadline - time.monotonic()))))
+                except queue.Empty:
+                    pass
+                if len(batch) >= self.batch_size or time.monotonic() >= deadline or self._stop_event.is_set():
+                    if batch:
+                        self._flush(conn, batch)
+                        batch = []
+                    deadline = time.monotonic() + self.flush_interval
+            if batch:
+                self._flush(conn, batch)
+        finally:
+            conn.close()
+
+    def _flush(self, conn, batch):
+        try:
+            with conn:
+                conn.executemany('INSERT INTO monitor_values (target_id, target, ts, value, raw) VALUES (?, ?, ?, ?, ?)',
+                                 batch)
+            self.written += len(batch)
+        except sqlite3.Error as e:
+            print("监控数值写入失败。", e)